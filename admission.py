@@ -0,0 +1,155 @@
+# admission.py
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+RATE_LIMIT_PER_MINUTE = float(os.getenv("AUDITSENSE_RATE_LIMIT_PER_MINUTE", "6"))
+RATE_LIMIT_BURST = int(os.getenv("AUDITSENSE_RATE_LIMIT_BURST", "3"))
+MAX_QUEUE_DEPTH = int(os.getenv("AUDITSENSE_MAX_QUEUE_DEPTH", "50"))
+ESTIMATED_JOB_SECONDS = float(os.getenv("AUDITSENSE_EST_JOB_SECONDS", "300"))
+# Time we promise results within; should match the submitResultTime window configured in Masumi
+RESULT_DEADLINE_SECONDS = float(os.getenv("AUDITSENSE_RESULT_DEADLINE_SECONDS", "3600"))
+TOTAL_WORKERS = int(os.getenv("AUDITSENSE_TOTAL_WORKERS", os.getenv("AUDITSENSE_WORKERS", "2")))
+
+DURATION_REFRESH_SECONDS = 30.0
+
+AWAITING_PAYMENT = "awaiting_payment"
+PAYMENT_EXPIRED = "payment_expired"
+
+
+@dataclass
+class AdmissionDecision:
+    allowed: bool
+    status_code: int = 200
+    reason: str = ""
+    retry_after: int = 0          # seconds
+    estimated_completion: float = 0.0
+
+    def headers(self) -> dict:
+        return {"Retry-After": str(self.retry_after)} if self.retry_after else {}
+
+
+def expire_unpaid_jobs(jobs: dict, now: float = None) -> list:
+    """
+    Mark jobs still awaiting payment after their `pay_by` time (epoch seconds)
+    as expired, so abandoned payment requests stop counting toward the backlog.
+    Returns the expired job ids.
+    """
+    now = time.time() if now is None else now
+    expired = []
+    for job_id, job in list(jobs.items()):
+        if job.get("status") == AWAITING_PAYMENT and job.get("pay_by") is not None and job["pay_by"] <= now:
+            job["status"] = PAYMENT_EXPIRED
+            expired.append(job_id)
+    return expired
+
+
+def count_awaiting_payment(jobs: dict) -> int:
+    return sum(1 for job in list(jobs.values()) if job.get("status") == AWAITING_PAYMENT)
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate: float, capacity: int, now: float = None):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic() if now is None else now
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, now: float = None) -> float:
+        """Take a token. Returns 0 on success, otherwise seconds until one is available."""
+        now = time.monotonic() if now is None else now
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else math.inf
+
+
+class AdmissionController:
+    """
+    Decide whether /start_job may accept another paid job.
+
+    Rejects with 429 when a purchaser exceeds their rate limit, and with 503
+    when the queue is full or the estimated completion time would miss the
+    result deadline. Checks run before a Masumi payment request is created.
+    """
+
+    def __init__(self, job_queue, workers: int = None, max_queue_depth: int = None,
+                 deadline_seconds: float = None, rate_per_minute: float = None, burst: int = None,
+                 max_tracked_purchasers: int = 10_000):
+        self.job_queue = job_queue
+        self.workers = max(1, workers or TOTAL_WORKERS)
+        self.max_queue_depth = max_queue_depth or MAX_QUEUE_DEPTH
+        self.deadline_seconds = deadline_seconds or RESULT_DEADLINE_SECONDS
+        self.rate = (rate_per_minute or RATE_LIMIT_PER_MINUTE) / 60.0
+        self.burst = burst or RATE_LIMIT_BURST
+        self.max_tracked_purchasers = max_tracked_purchasers
+
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self._job_seconds = ESTIMATED_JOB_SECONDS
+        self._job_seconds_checked = 0.0
+
+    def job_seconds(self) -> float:
+        """Average job duration from recent completions, refreshed every 30 s."""
+        now = time.monotonic()
+        if now - self._job_seconds_checked > DURATION_REFRESH_SECONDS:
+            self._job_seconds_checked = now
+            measured = self.job_queue.average_duration()
+            if measured:
+                self._job_seconds = measured
+        return self._job_seconds
+
+    def estimate_completion(self, backlog: int) -> float:
+        """Seconds until a job submitted now would finish, given `backlog` jobs ahead of it."""
+        return math.ceil((backlog + 1) / self.workers) * self.job_seconds()
+
+    def _check_rate(self, purchaser: str) -> float:
+        with self._lock:
+            bucket = self._buckets.get(purchaser)
+            if bucket is None:
+                bucket = self._buckets[purchaser] = TokenBucket(self.rate, self.burst)
+            self._buckets.move_to_end(purchaser)
+            while len(self._buckets) > self.max_tracked_purchasers:
+                self._buckets.popitem(last=False)
+            return bucket.try_take()
+
+    def admit(self, purchaser: str, pending_jobs: int = 0) -> AdmissionDecision:
+        """
+        Args:
+            purchaser: identifier_from_purchaser
+            pending_jobs: accepted jobs still awaiting payment (they join the queue once paid)
+        """
+        backlog = self.job_queue.depth() + pending_jobs
+        slot_wait = max(1, math.ceil(self.job_seconds() / self.workers))
+
+        if backlog >= self.max_queue_depth:
+            return AdmissionDecision(False, 503, "Job queue is full", retry_after=slot_wait)
+
+        eta = self.estimate_completion(backlog)
+        if eta > self.deadline_seconds:
+            return AdmissionDecision(
+                False, 503,
+                f"Estimated completion in {int(eta)}s exceeds the {int(self.deadline_seconds)}s result deadline",
+                retry_after=slot_wait,
+                estimated_completion=eta,
+            )
+
+        # Only consume a rate-limit token once capacity checks pass
+        wait = self._check_rate(purchaser)
+        if wait:
+            return AdmissionDecision(
+                False, 429, "Rate limit exceeded for purchaser", retry_after=max(1, math.ceil(wait))
+            )
+
+        return AdmissionDecision(True, estimated_completion=eta)
@@ -16,7 +16,7 @@ audit_report_agent = Agent(
         "domains, gaps, risks, and practical next steps."
     ),
     tools=[],          # LLM-only agent
-    llm=None,          # Crew will inject the LLM via chat_llm
+    llm=None,          # AuditSenseCrew sets the stage's model tier (model_routing.py)
     verbose=True,
 )
 
@@ -66,3 +66,32 @@ audit_report_task = Task(
     ),
     agent=audit_report_agent,
 )
+
+# --- Summary Task (staged pipeline) ---
+# AuditSenseCrew.run() scores domains locally; the LLM only writes the narrative.
+
+audit_summary_task = Task(
+    name="Summarize Audit Readiness",
+    description=(
+        "Input:\n"
+        "- standard_name: {standard_name}\n"
+        "- scope: {scope}\n"
+        "- overall_readiness: {overall_readiness}\n"
+        "- completeness: {completeness}\n"
+        "- domain_gaps: {domain_gaps}\n\n"
+        "Task:\n"
+        "Scores are already computed (covered = 1, partially_covered = 0.5, not_covered = 0). "
+        "`domain_gaps` lists each domain's score, number of missing controls and key gaps, "
+        "weakest domain first.\n"
+        "1. Write a short human-readable summary of audit readiness. If `completeness` says "
+        "PARTIAL, state clearly that the assessment is partial and covers only the evaluated controls.\n"
+        "2. Produce 3–7 global recommendations, addressing the weakest domains first.\n"
+        "Return a Python dict:\n\n"
+        "{\n"
+        "  'overall_summary': '...',\n"
+        "  'global_recommendations': ['...', '...', '...']\n"
+        "}\n"
+    ),
+    expected_output="A Python dict with keys: overall_summary, global_recommendations.",
+    agent=audit_report_agent,
+)
@@ -15,7 +15,7 @@ evidence_mapper_agent = Agent(
         "the provided documents, extract supporting evidence, and identify gaps."
     ),
     tools=[],          # LLM only
-    llm=None,          # LLM provided by Crew via chat_llm
+    llm=None,          # AuditSenseCrew sets the stage's model tier (model_routing.py)
     verbose=True,
 )
 
@@ -34,7 +34,12 @@ evidence_mapper_task = Task(
         "2. evidence: list of dicts like:\n"
         "   { 'doc_id': '...', 'snippet': '...', 'score': 0-1 }\n"
         "3. missing_elements: a list of specific requirements not found\n"
-        "4. notes: short auditor-style reasoning\n\n"
+        "4. notes: short auditor-style reasoning\n"
+        "5. confidence: 0-1, how sure you are of the coverage verdict\n\n"
+
+        "A control may carry `related_evaluation`: the verdict for an equivalent control of "
+        "another standard on the same documents. Use it as a starting point, but confirm it "
+        "against the documents and this control's own wording.\n\n"
 
         "Output:\n"
         "A Python list of dicts, e.g.:\n\n"
@@ -46,13 +51,14 @@ evidence_mapper_task = Task(
         "      { 'doc_id': 'policy.txt', 'snippet': '...', 'score': 0.82 }\n"
         "    ],\n"
         "    'missing_elements': ['no annual review cycle'],\n"
-        "    'notes': 'Some coverage exists but incomplete.'\n"
+        "    'notes': 'Some coverage exists but incomplete.',\n"
+        "    'confidence': 0.8\n"
         "  }\n"
         "]"
     ),
     expected_output=(
         "A Python list of dicts. Each dict represents a control evaluation with keys: "
-        "control_id, coverage, evidence, missing_elements, notes."
+        "control_id, coverage, evidence, missing_elements, notes, confidence."
     ),
     agent=evidence_mapper_agent,
 )
@@ -1,10 +1,9 @@
 # agents/standard_extractor_agent.py
 
-from crewai import Agent, Task, LLM
+from crewai import Agent, Task
+from model_routing import llm_for_stage
 from tools.fetch_document_tool import FetchDocumentTool
 
-llm = LLM(model="openai/gpt-5-nano")
-
 # --- Standard Extractor Agent ---
 
 standard_extractor_agent = Agent(
@@ -19,7 +18,7 @@ standard_extractor_agent = Agent(
     ),
     tools=[FetchDocumentTool()],   # <-- added
     verbose=True,
-    llm=llm,
+    llm=llm_for_stage("extraction"),
 )
 
 # --- Standard Extractor Task ---
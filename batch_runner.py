@@ -0,0 +1,192 @@
+# batch_runner.py
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from cancellation import CancellationToken
+from logging_config import setup_logging, get_logger
+from profiling import JobProfiler
+
+DEFAULT_PARALLELISM = int(os.getenv("AUDITSENSE_BATCH_PARALLELISM", "4"))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Manifest / results I/O
+# ─────────────────────────────────────────────────────────────────────────────
+def row_id(row: dict) -> str:
+    """Use the manifest's `id` column, or a stable hash of the row."""
+    if row.get("id"):
+        return str(row["id"])
+    return hashlib.sha256(json.dumps(row, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def read_manifest(path: str) -> list:
+    """
+    Read a JSONL or CSV manifest of audits.
+
+    Each row holds pipeline inputs: standard_id or standard_url (+ standard_name),
+    source_url, doc_id, scope, and optionally an `id`.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            rows = [{k: v for k, v in row.items() if v not in (None, "")} for row in csv.DictReader(f)]
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    for row in rows:
+        row["id"] = row_id(row)
+    return rows
+
+
+def completed_ids(output_path: str) -> set:
+    """IDs already finished in a previous (possibly interrupted) run."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by the interruption
+            if record.get("status") == "completed":
+                done.add(record["id"])
+    return done
+
+
+def _ends_mid_line(path: str) -> bool:
+    if not os.path.getsize(path):
+        return False
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b"\n"
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Runner
+# ─────────────────────────────────────────────────────────────────────────────
+class BatchRunner:
+    """
+    Run many audits in one process, sharing the crew, the text extraction
+    cache, the standards catalog and loaded evidence documents.
+    """
+
+    def __init__(self, parallelism: int = None, crew=None, logger=None, timeout: float = None,
+                 profile_dir: str = None):
+        self.parallelism = max(1, parallelism or DEFAULT_PARALLELISM)
+        self.timeout = timeout  # seconds per row; None = only the per-stage timeouts
+        self.profile_dir = profile_dir  # write a profile per row here when set
+        self.logger = logger or get_logger(__name__)
+        self._crew = crew
+        self._crew_lock = threading.Lock()
+        self._documents = {}
+        self._document_locks = {}
+        self._documents_lock = threading.Lock()
+
+    @property
+    def crew(self):
+        with self._crew_lock:
+            if self._crew is None:
+                from crew_definition import AuditSenseCrew  # heavy import, only when actually running
+
+                self._crew = AuditSenseCrew(verbose=False, logger=self.logger)
+            return self._crew
+
+    def _documents_for(self, row: dict) -> dict:
+        """Load each evidence URL once per batch, even when many rows share it."""
+        key = (row.get("source_url"), row.get("doc_id"))
+        with self._documents_lock:
+            lock = self._document_locks.setdefault(key, threading.Lock())
+        with lock:
+            if key not in self._documents:
+                self._documents[key] = self.crew.load_documents(row)
+            return self._documents[key]
+
+    def run_row(self, row: dict) -> dict:
+        inputs = dict(row)
+        if not inputs.get("documents"):
+            inputs["documents"] = self._documents_for(row)
+        deadline = time.time() + self.timeout if self.timeout else None
+        return self.crew.run(inputs, cancel_token=CancellationToken(deadline=deadline))
+
+    def run(self, rows: list, output_path: str, resume: bool = True, runner=None) -> dict:
+        """
+        Run `rows` and append one JSON line per row to `output_path`.
+
+        With `resume`, rows already completed in `output_path` are skipped;
+        failed rows are retried.
+        """
+        runner = runner or self.run_row
+        done = completed_ids(output_path) if resume else set()
+        pending = [row for row in rows if row["id"] not in done]
+        summary = {"total": len(rows), "skipped": len(rows) - len(pending), "completed": 0, "failed": 0}
+        self.logger.info("Batch: %d rows, %d already done, %d to run with parallelism %d",
+                         len(rows), summary["skipped"], len(pending), self.parallelism)
+
+        write_lock = threading.Lock()
+        mode = "a" if resume else "w"
+        with open(output_path, mode, encoding="utf-8") as out, \
+                ThreadPoolExecutor(max_workers=self.parallelism) as pool:
+            if resume and _ends_mid_line(output_path):
+                out.write("\n")  # isolate a record cut short by the interruption
+            futures = {pool.submit(self._timed, runner, row): row for row in pending}
+            for future in as_completed(futures):
+                row = futures[future]
+                record = future.result()
+                record["id"] = row["id"]
+                with write_lock:
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    out.flush()  # every finished row survives an interruption
+                summary[record["status"]] += 1
+
+        return summary
+
+    def _timed(self, runner, row: dict) -> dict:
+        started = time.perf_counter()
+        try:
+            if self.profile_dir:
+                with JobProfiler(row["id"], self.profile_dir):
+                    report = runner(row)
+            else:
+                report = runner(row)
+            record = {"status": "completed", "report": report}
+        except Exception as e:
+            self.logger.error("Batch row %s failed: %s", row["id"], e, exc_info=True)
+            record = {"status": "failed", "error": str(e)}
+        record["seconds"] = round(time.perf_counter() - started, 3)
+        return record
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# CLI
+# ─────────────────────────────────────────────────────────────────────────────
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run AuditSense audits in bulk from a manifest.")
+    parser.add_argument("manifest", help="JSONL or CSV file, one audit per row")
+    parser.add_argument("-o", "--output", default="batch_results.jsonl", help="JSONL results file")
+    parser.add_argument("-j", "--parallel", type=int, default=DEFAULT_PARALLELISM, help="concurrent audits")
+    parser.add_argument("--no-resume", action="store_true", help="overwrite output instead of resuming")
+    parser.add_argument("--timeout", type=float, default=None, help="seconds allowed per audit")
+    parser.add_argument("--profile", metavar="DIR", default=None,
+                        help="write flamegraph/speedscope profiles per audit to DIR")
+    args = parser.parse_args(argv)
+
+    setup_logging()
+    os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+
+    rows = read_manifest(args.manifest)
+    summary = BatchRunner(
+        parallelism=args.parallel, timeout=args.timeout, profile_dir=args.profile
+    ).run(rows, args.output, resume=not args.no_resume)
+    print(json.dumps(summary))
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,153 @@
+# cancellation.py
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+
+# Seconds each stage may run before it is abandoned (AUDITSENSE_STAGE_TIMEOUT_<STAGE>)
+DEFAULT_STAGE_TIMEOUTS = {
+    "extraction": 600.0,
+    "loading": 120.0,
+    "mapping": 900.0,
+    "escalation": 600.0,
+    "report": 300.0,
+}
+# Finish this long before submitResultTime so the result can still be submitted
+DEADLINE_MARGIN_SECONDS = float(os.getenv("AUDITSENSE_DEADLINE_MARGIN_SECONDS", "60"))
+POLL_INTERVAL = 0.5
+
+
+class JobCancelled(Exception):
+    """Raised inside the pipeline once its job has been cancelled."""
+
+
+class DeadlineExceeded(JobCancelled):
+    """Raised when the job or the current stage ran out of time."""
+
+
+def stage_timeout(stage: str):
+    value = os.getenv(f"AUDITSENSE_STAGE_TIMEOUT_{stage.upper()}")
+    return float(value) if value else DEFAULT_STAGE_TIMEOUTS.get(stage)
+
+
+def deadline_from_submit_result_time(submit_result_time, margin: float = None):
+    """
+    Convert Masumi's submitResultTime (epoch milliseconds, as int or string)
+    into an epoch-seconds deadline with a safety margin. Returns None if unset.
+    """
+    if submit_result_time in (None, ""):
+        return None
+    margin = DEADLINE_MARGIN_SECONDS if margin is None else margin
+    value = float(submit_result_time)
+    if value > 1e11:  # milliseconds
+        value /= 1000.0
+    return value - margin
+
+
+class CancellationToken:
+    """
+    Cooperative cancellation shared by every stage of one job.
+
+    Stages call `check()` at safe points; CrewAI runs call it on every agent
+    step via `step_callback`. `run()` executes blocking work (e.g. a crew
+    kickoff) in a helper thread and gives up as soon as the token is
+    cancelled or the deadline passes, so the caller's slot is freed at once.
+    """
+
+    def __init__(self, deadline: float = None, parent: "CancellationToken" = None):
+        self.deadline = deadline           # epoch seconds, None = no overall deadline
+        self.reason = None
+        self.expired = False               # stopped by a deadline rather than a cancel
+        self._parent = parent
+        self._event = threading.Event()
+        self._local = threading.local()    # per-thread stage deadline
+
+    def child(self, deadline: float = None) -> "CancellationToken":
+        """
+        A token that stops when this one does, or earlier at its own `deadline`.
+        Expiring the child leaves this token running.
+        """
+        deadlines = [d for d in (self.deadline, deadline) if d is not None]
+        return CancellationToken(deadline=min(deadlines) if deadlines else None, parent=self)
+
+    # --- State ---
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set() or (self._parent is not None and self._parent.cancelled)
+
+    def effective_deadline(self):
+        stage_deadline = getattr(self._local, "deadline", None)
+        deadlines = [d for d in (self.deadline, stage_deadline) if d is not None]
+        return min(deadlines) if deadlines else None
+
+    def remaining(self):
+        """Seconds left before the nearest deadline, or None if unbounded."""
+        deadline = self.effective_deadline()
+        return None if deadline is None else deadline - time.time()
+
+    def check(self) -> None:
+        parent = self._parent
+        if parent is not None and parent.cancelled and not self._event.is_set():
+            self.expired = parent.expired
+            self.cancel(parent.reason)
+        if self._event.is_set():
+            raise (DeadlineExceeded if self.expired else JobCancelled)(self.reason)
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            stage = getattr(self._local, "stage", None)
+            reason = f"deadline exceeded during {stage}" if stage else "deadline exceeded"
+            if self.deadline is not None and self.deadline <= time.time():
+                # The job's own deadline stops every stage; a stage timeout only this one
+                self.expired = True
+                self.cancel(reason)
+            raise DeadlineExceeded(reason)
+
+    def step_callback(self, *_args, **_kwargs) -> None:
+        """CrewAI step/task callback: aborts the agent loop once cancelled."""
+        self.check()
+
+    # --- Scopes ---
+
+    @contextmanager
+    def stage(self, name: str, timeout: float = None):
+        """Apply the stage's timeout (configured default if not given) within the block."""
+        timeout = stage_timeout(name) if timeout is None else timeout
+        previous = (getattr(self._local, "stage", None), getattr(self._local, "deadline", None))
+        self._local.stage = name
+        self._local.deadline = time.time() + timeout if timeout else None
+        try:
+            self.check()
+            yield self
+        finally:
+            self._local.stage, self._local.deadline = previous
+
+    def run(self, fn, *args, **kwargs):
+        """
+        Run `fn` in a helper thread, returning its result, or raise as soon as
+        the token is cancelled or the deadline passes. An abandoned call keeps
+        running only until its next `check()`.
+        """
+        self.check()
+        executor = ThreadPoolExecutor(max_workers=1)
+        stage_state = (getattr(self._local, "stage", None), getattr(self._local, "deadline", None))
+
+        def call():
+            # Helper thread sees the caller's stage deadline
+            self._local.stage, self._local.deadline = stage_state
+            return fn(*args, **kwargs)
+
+        future = executor.submit(call)
+        executor.shutdown(wait=False)
+        while True:
+            try:
+                return future.result(timeout=POLL_INTERVAL)
+            except FutureTimeout:
+                self.check()
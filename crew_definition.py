@@ -1,7 +1,34 @@
 # crew_definition.py
 
-from crewai import Crew, LLM
+import contextvars
+import os
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+
+from crewai import Crew
+from cancellation import CancellationToken, DeadlineExceeded
 from logging_config import get_logger
+from model_routing import TierStats, is_low_confidence, llm_for_stage, tier_for_stage, tier_stats
+from profiling import profile_stage, profiled_thread
+from pipeline.control_equivalence import ControlEquivalenceIndex, documents_hash
+from pipeline.domain_partition import (
+    MappingResult,
+    build_report,
+    gap_digest,
+    local_summary,
+    mapped_readiness,
+    merge_domain_scores,
+    overall_readiness,
+    partition_controls,
+    prioritize_partitions,
+    score_domain,
+)
+from pipeline.parsing import parse_task_output
+from pipeline.prescreen import TfidfIndex, evidence_excerpts, prescreen_controls
+from pipeline.snippet_index import SnippetIndex, verify_evaluations
+from pipeline.text_store import text_store as default_text_store
+from standards.catalog import get_standard
+from tools.fetch_document_tool import FetchDocumentTool
 
 from agents.standard_extractor_agent import (
     standard_extractor_agent,
@@ -18,8 +45,16 @@ from agents.evidence_mapper_agent import (
 from agents.audit_report_agent import (
     audit_report_agent,
     audit_report_task,
+    audit_summary_task,
 )
 
+# Domain partitions mapped concurrently within one run
+DEFAULT_PARTITION_WORKERS = int(os.getenv("AUDITSENSE_PARTITION_WORKERS", "4"))
+# With a deadline, deliver a partial report instead of nothing when time runs out
+PARTIAL_REPORTS = os.getenv("AUDITSENSE_PARTIAL_REPORTS", "true").lower() in ("1", "true", "yes")
+# Seconds before the deadline at which mapping stops so the report can still be written
+REPORT_RESERVE_SECONDS = float(os.getenv("AUDITSENSE_REPORT_RESERVE_SECONDS", "90"))
+
 
 class AuditSenseCrew:
     """
@@ -30,11 +65,30 @@ class AuditSenseCrew:
       4. Audit Report Generator   → Produce readiness assessment output
 
     This matches the class-based structure used in DocuLensAI.
+
+    `crew` runs all four tasks in one sequential kickoff. `run()` executes the
+    same stages one at a time so local steps (e.g. pre-screening) can sit
+    between them, maps each control domain as its own parallel unit, and
+    scores domains locally before a short LLM summary.
     """
 
-    def __init__(self, verbose=True, logger=None):
+    # Stage of each agent, used to route it to a model tier (see model_routing.py)
+    AGENT_STAGES = {
+        "Compliance Standard & Control Extractor": "extraction",
+        "Audit Document Loader": "loading",
+        "Evidence Mapper": "mapping",
+        "Audit Report Generator": "report",
+    }
+
+    def __init__(self, verbose=True, logger=None, prescreen_threshold=None, equivalence_index=None,
+                 partition_workers=None, text_store=None):
         self.verbose = verbose
+        self.text_store = text_store or default_text_store
+        self.partition_workers = partition_workers or DEFAULT_PARTITION_WORKERS
         self.logger = logger or get_logger(__name__)
+        self.prescreen_threshold = prescreen_threshold
+        self.equivalence_index = equivalence_index or ControlEquivalenceIndex()
+        self.usage = TierStats()  # latency, tokens and cost per tier for this crew's runs
 
         self.logger.info("Initializing AuditSenseCrew…")
         self.crew = self._create_crew()
@@ -45,8 +99,6 @@ class AuditSenseCrew:
 
         self.logger.info("Creating agent pipeline…")
 
-        llm = LLM(model="gpt-5-nano")
-
         crew = Crew(
             agents=[
                 standard_extractor_agent,
@@ -60,9 +112,283 @@ class AuditSenseCrew:
                 evidence_mapper_task,
                 audit_report_task,
             ],
-            chat_llm=llm,
             verbose=self.verbose,
-        )
+        ).copy()
+
+        # Each agent gets its stage's model instead of a crew-wide default
+        for agent in crew.agents:
+            agent.llm = llm_for_stage(self.AGENT_STAGES[agent.role])
 
         self.logger.info("Crew assembly complete.")
         return crew
+
+    # ─────────────────────────────────────────────────────────────────────
+    # Staged execution
+    # ─────────────────────────────────────────────────────────────────────
+    def run(self, inputs: dict, cancel_token: CancellationToken = None) -> dict:
+        """
+        Run extract → load → pre-screen → map → report and return the report dict.
+
+        `cancel_token` aborts the run between (and inside) stages when the job
+        is cancelled or its deadline passes; stages then raise JobCancelled.
+        If the token has a deadline, mapping stops early enough to return a
+        report marked `partial` over the controls evaluated so far.
+        """
+        inputs = dict(inputs)
+        cancel_token = cancel_token or CancellationToken()
+        if inputs.get("standard_id") and not inputs.get("controls"):
+            # Catalog standards skip both fetching and extraction
+            standard = get_standard(inputs["standard_id"])
+            self.logger.info("Using catalog standard %s (%d controls)",
+                             standard["standard_id"], len(standard["controls"]))
+            inputs["controls"] = standard["controls"]
+            inputs["standard_name"] = inputs.get("standard_name") or standard["name"]
+
+        controls = self.extract_controls(inputs, cancel_token)
+        documents = self.load_documents(inputs, cancel_token)
+        standard_key = inputs.get("standard_id") or inputs.get("standard_name") or inputs.get("standard_url")
+        mapping = self.map_and_score(controls, documents, standard_key, cancel_token)
+        report = self.generate_report(
+            inputs, mapping.evaluations, cancel_token, mapping.domain_scores, mapping.unevaluated
+        )
+
+        self.logger.info("Model usage per tier: %s", self.usage.snapshot())
+        return report
+
+    def _run_stage(self, agent, task, inputs: dict, stage: str, cancel_token: CancellationToken = None):
+        """Kick off a single-task crew on the stage's model tier and parse the agent's answer."""
+        tier = tier_for_stage(stage)
+        cancel_token = cancel_token or CancellationToken()
+
+        # copy() clones the module-level agent/task so setting the LLM never leaks between stages
+        crew = Crew(agents=[agent], tasks=[task], verbose=self.verbose).copy()
+        crew.agents[0].llm = llm_for_stage(stage)
+        # Every agent step checks the token, so an abandoned kickoff stops at its next step
+        crew.step_callback = cancel_token.step_callback
+
+        started = time.perf_counter()
+        with cancel_token.stage(stage), profile_stage(stage) as timer:
+            output = cancel_token.run(timer.track(crew.kickoff), inputs=inputs)
+        elapsed = time.perf_counter() - started
+
+        usage = getattr(output, "token_usage", None)
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        for stats in (self.usage, tier_stats):
+            stats.record(tier, elapsed, prompt_tokens, completion_tokens)
+        self.logger.info(
+            "Stage %s on %s tier took %.1fs (%d prompt / %d completion tokens)",
+            stage, tier, elapsed, prompt_tokens, completion_tokens,
+        )
+        return parse_task_output(output.raw)
+
+    def extract_controls(self, inputs: dict, cancel_token: CancellationToken = None) -> list:
+        if inputs.get("controls"):
+            return inputs["controls"]
+
+        self.logger.info("Extracting controls for %s", inputs.get("standard_name"))
+        return self._run_stage(standard_extractor_agent, standard_extractor_task, {
+            "standard_name": inputs.get("standard_name"),
+            "standard_url": inputs.get("standard_url"),
+        }, stage="extraction", cancel_token=cancel_token)
+
+    def load_documents(self, inputs: dict, cancel_token: CancellationToken = None) -> dict:
+        """
+        Fetch evidence directly with the loader's tool; this stage needs no LLM.
+        Documents are returned as memory-mapped views of the text store.
+        """
+        if inputs.get("documents"):
+            return inputs["documents"]
+
+        doc_id = inputs.get("doc_id") or "evidence"
+        cancel_token = cancel_token or CancellationToken()
+        with cancel_token.stage("loading"), profile_stage("loading"):
+            result = FetchDocumentTool()._run(
+                source_url=inputs.get("source_url"), cancel_token=cancel_token, text_store=self.text_store
+            )
+        if result["error"]:
+            raise RuntimeError(f"Failed to load evidence document {doc_id}: {result['error']}")
+        return {doc_id: self.text_store.open(result["document_ref"])}
+
+    def map_evidence(self, controls: list, documents: dict, standard_key: str = None,
+                     cancel_token: CancellationToken = None) -> list:
+        """Evaluations for `controls`, in control order (see map_and_score)."""
+        return self.map_and_score(controls, documents, standard_key, cancel_token).evaluations
+
+    def map_and_score(self, controls: list, documents: dict, standard_key: str = None,
+                      cancel_token: CancellationToken = None) -> MappingResult:
+        """
+        Pre-screen controls locally and reuse evaluations of equivalent controls
+        mapped earlier on the same evidence. The rest are mapped, verified and
+        scored per domain partition, with partitions running in parallel.
+
+        With a deadline, high-priority controls are mapped first and mapping
+        stops REPORT_RESERVE_SECONDS before it; controls not reached by then
+        are returned as `unevaluated`.
+        """
+        cancel_token = cancel_token or CancellationToken()
+        deadline_aware = PARTIAL_REPORTS and cancel_token.deadline is not None
+        mapping_token = cancel_token
+        if deadline_aware:
+            mapping_token = cancel_token.child(cancel_token.deadline - REPORT_RESERVE_SECONDS)
+
+        with profile_stage("prescreen"):
+            # One passage index serves pre-screening and every partition's mapper excerpts
+            index = TfidfIndex.from_documents(documents)
+            screened = prescreen_controls(controls, documents, threshold=self.prescreen_threshold, index=index)
+        self.logger.info(
+            "Pre-screen: %d of %d controls have no candidate evidence",
+            len(screened.not_covered), len(controls),
+        )
+
+        evidence_hash = documents_hash(documents)
+        reuse = self.equivalence_index.lookup(screened.candidates, evidence_hash)
+        if reuse.reused:
+            self.logger.info("Reused %d evaluations from equivalent controls", len(reuse.reused))
+
+        settled = {e.get("control_id"): e for e in reuse.reused + screened.not_covered}
+        to_map = {c.get("id"): c for c in reuse.to_map}  # may carry a related_evaluation hint
+
+        snippet_indexes = {}
+        if to_map:
+            # Built once and shared read-only by every partition's verification
+            with profile_stage("verification"):
+                snippet_indexes = {doc_id: SnippetIndex(text) for doc_id, text in documents.items()}
+
+        # Shared by the partitions so one failing stops its running siblings
+        partition_token = mapping_token.child()
+
+        def map_partition(domain, members):
+            pending = [to_map[c.get("id")] for c in members if c.get("id") in to_map]
+            mapped = []
+            if pending:
+                try:
+                    mapped = self._map(pending, documents, "mapping", partition_token, index)
+                    mapped = self._escalate(pending, documents, mapped, partition_token, index)
+                except DeadlineExceeded:
+                    # Only the mapping deadline cuts a partition short; a stage timeout is a failure
+                    if not (deadline_aware and (partition_token.expired or time.time() >= mapping_token.deadline)):
+                        raise
+                    # Keep whatever was mapped before time ran out
+                    self.logger.warning("Out of time mapping %s; %d evaluations kept", domain, len(mapped))
+                # Check every quoted snippet against the source text; no LLM call
+                with profile_stage("verification"):
+                    verify_evaluations(mapped, documents, indexes=snippet_indexes)
+            by_id = {e.get("control_id"): e for e in mapped}
+            by_id.update(settled)
+            evaluations = [by_id[c.get("id")] for c in members if c.get("id") in by_id]
+            return pending, mapped, evaluations, score_domain(domain, members, evaluations)
+
+        partitions = prioritize_partitions(controls) if deadline_aware else partition_controls(controls)
+        self.logger.info("Mapping %d controls in %d domain partitions", len(reuse.to_map), len(partitions))
+        results = self._run_partitions(partitions, map_partition, partition_token)
+
+        mapped_controls = [c for pending, _, _, _ in results for c in pending]
+        if mapped_controls:
+            mapped = [e for _, partition_mapped, _, _ in results for e in partition_mapped]
+            self.equivalence_index.record(standard_key, mapped_controls, mapped, evidence_hash)
+
+        # Keep the extractor's control order in the final evaluation list
+        by_id = {e.get("control_id"): e for _, _, evaluations, _ in results for e in evaluations}
+        result = MappingResult(
+            evaluations=[by_id[c.get("id")] for c in controls if c.get("id") in by_id],
+            domain_scores=merge_domain_scores([score for _, _, _, score in results]),
+            unevaluated=[c.get("id") for c in controls if c.get("id") not in by_id],
+        )
+        if result.unevaluated:
+            self.logger.warning("Deadline reached: %d of %d controls not evaluated",
+                                len(result.unevaluated), len(controls))
+        return result
+
+    def _run_partitions(self, partitions: list, fn, cancel_token: CancellationToken = None) -> list:
+        """
+        Run `fn(domain, controls)` per partition, in parallel, keeping partition
+        order. If one partition fails, `cancel_token` is cancelled so the
+        partitions already running stop at their next check.
+        """
+        if len(partitions) <= 1 or self.partition_workers <= 1:
+            return [fn(domain, members) for domain, members in partitions]
+
+        pool = ThreadPoolExecutor(max_workers=min(self.partition_workers, len(partitions)),
+                                  thread_name_prefix="auditsense-partition")
+        try:
+            # copy_context() carries the active profiler into the pool threads
+            futures = [pool.submit(contextvars.copy_context().run, profiled_thread(fn), domain, members)
+                       for domain, members in partitions]
+            done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+            failed = next((f for f in futures if f in done and f.exception()), None)
+            if failed is not None:
+                if cancel_token is not None:
+                    cancel_token.cancel(f"partition failed: {failed.exception()}")
+                raise failed.exception()
+            return [future.result() for future in futures]
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _map(self, controls: list, documents: dict, stage: str, cancel_token: CancellationToken = None,
+             index: TfidfIndex = None) -> list:
+        # Large documents reach the prompt only as the passages relevant to these controls
+        return self._run_stage(evidence_mapper_agent, evidence_mapper_task, {
+            "controls": controls,
+            "documents": evidence_excerpts(controls, documents, index),
+        }, stage=stage, cancel_token=cancel_token)
+
+    def _escalate(self, controls: list, documents: dict, mapped: list,
+                  cancel_token: CancellationToken = None, index: TfidfIndex = None) -> list:
+        """Re-map missing or low-confidence evaluations on the strong tier."""
+        mapped_by_id = {e.get("control_id"): e for e in mapped}
+        uncertain = [
+            c for c in controls
+            if c.get("id") not in mapped_by_id or is_low_confidence(mapped_by_id[c.get("id")])
+        ]
+        if not uncertain:
+            return mapped
+
+        self.logger.info("Escalating %d of %d mapped controls to the strong tier",
+                         len(uncertain), len(controls))
+        for evaluation in self._map(uncertain, documents, "escalation", cancel_token, index):
+            evaluation["escalated"] = True
+            mapped_by_id[evaluation.get("control_id")] = evaluation
+        return list(mapped_by_id.values())
+
+    def generate_report(self, inputs: dict, evaluations: list, cancel_token: CancellationToken = None,
+                        domain_scores: list = None, unevaluated: list = None) -> dict:
+        """
+        Merge evaluations and local domain scores into the report structure;
+        the LLM only writes the summary and recommendations from a gap digest.
+        Reports with `unevaluated` controls are marked `partial`.
+        """
+        unevaluated = unevaluated or []
+        total = len(evaluations) + len(unevaluated)
+        if domain_scores is None:
+            scored = [{"id": e.get("control_id"), "domain": e.get("domain")} for e in evaluations]
+            domain_scores = merge_domain_scores([
+                score_domain(domain, members, evaluations) for domain, members in partition_controls(scored)
+            ])
+
+        if unevaluated:
+            mapped = mapped_readiness(evaluations)
+            completeness = (
+                f"PARTIAL: only {len(evaluations)} of {total} controls were evaluated before the deadline; "
+                "overall_readiness counts pre-screened controls as not covered, "
+                + ("none were mapped to evidence" if mapped is None
+                   else f"controls mapped to evidence alone score {mapped}")
+            )
+        else:
+            completeness = f"complete: all {total} controls evaluated"
+        try:
+            summary = self._run_stage(audit_report_agent, audit_summary_task, {
+                "standard_name": inputs.get("standard_name"),
+                "scope": inputs.get("scope"),
+                "overall_readiness": overall_readiness(evaluations),
+                "completeness": completeness,
+                "domain_gaps": gap_digest(domain_scores),
+            }, stage="report", cancel_token=cancel_token)
+        except DeadlineExceeded:
+            if not (PARTIAL_REPORTS and cancel_token is not None and cancel_token.deadline is not None):
+                raise
+            self.logger.warning("No time left for the report model; summarizing locally")
+            summary = local_summary(evaluations, domain_scores, unevaluated)
+        return build_report(
+            inputs.get("standard_name"), inputs.get("scope"), evaluations, domain_scores, summary, unevaluated
+        )
@@ -0,0 +1,241 @@
+# job_queue.py
+
+import json
+import os
+import random
+import sqlite3
+import time
+from contextlib import contextmanager
+
+DEFAULT_QUEUE_PATH = os.getenv("AUDITSENSE_QUEUE_PATH", os.path.join("state", "jobs.db"))
+DEFAULT_VISIBILITY_TIMEOUT = float(os.getenv("AUDITSENSE_VISIBILITY_TIMEOUT", "300"))
+DEFAULT_MAX_ATTEMPTS = int(os.getenv("AUDITSENSE_MAX_ATTEMPTS", "3"))
+
+BACKOFF_BASE_SECONDS = 5.0
+BACKOFF_MAX_SECONDS = 300.0
+
+QUEUED, RUNNING, COMPLETED, FAILED, CANCELLED = "queued", "running", "completed", "failed", "cancelled"
+FINISHED_STATUSES = (COMPLETED, FAILED, CANCELLED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id           TEXT PRIMARY KEY,
+    payload          TEXT NOT NULL,
+    priority         INTEGER NOT NULL DEFAULT 0,
+    status           TEXT NOT NULL,
+    attempts         INTEGER NOT NULL DEFAULT 0,
+    max_attempts     INTEGER NOT NULL,
+    available_at     REAL NOT NULL,
+    lease_owner      TEXT,
+    lease_expires_at REAL,
+    result           TEXT,
+    error            TEXT,
+    enqueued_at      REAL NOT NULL,
+    started_at       REAL,
+    finished_at      REAL,
+    deadline         REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, priority DESC, available_at);
+"""
+
+
+def backoff_delay(attempts: int) -> float:
+    """Exponential backoff with jitter for the given number of failed attempts."""
+    delay = min(BACKOFF_BASE_SECONDS * (2 ** max(attempts - 1, 0)), BACKOFF_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+class JobQueue:
+    """
+    Durable, SQLite-backed job queue shared by the API and worker processes.
+
+    - Higher `priority` runs first; ties run in enqueue order.
+    - A claimed job is leased for `visibility_timeout` seconds. If the worker
+      dies without heartbeating, the job becomes visible again and is retried.
+    - Failures are retried with exponential backoff up to `max_attempts`.
+    - A job may carry a `deadline` (epoch seconds); it is never started after it.
+    - `cancel()` finishes a job at once; its worker notices via `heartbeat()`/`status()`.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or DEFAULT_QUEUE_PATH
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "deadline" not in columns:  # queue files created before deadlines existed
+                conn.execute("ALTER TABLE jobs ADD COLUMN deadline REAL")
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per call keeps the queue safe across threads and processes
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    # --- Producer side ---
+
+    def enqueue(self, job_id: str, payload: dict, priority: int = 0, max_attempts: int = None,
+                deadline: float = None) -> bool:
+        """Add a job. Returns False if the job_id is already queued (callbacks may fire twice)."""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO jobs (job_id, payload, priority, status, max_attempts, "
+                "available_at, enqueued_at, deadline) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, json.dumps(payload), priority, QUEUED,
+                 max_attempts or DEFAULT_MAX_ATTEMPTS, now, now, deadline),
+            )
+            return cursor.rowcount == 1
+
+    def cancel(self, job_id: str) -> str:
+        """
+        Cancel a queued or running job. Returns the job's status afterwards
+        (None if unknown); finished jobs are left untouched.
+        """
+        with self._transaction() as conn:
+            row = conn.execute("SELECT status FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            if row["status"] in FINISHED_STATUSES:
+                return row["status"]
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = 'cancelled', finished_at = ?, lease_owner = NULL "
+                "WHERE job_id = ?",
+                (CANCELLED, time.time(), job_id),
+            )
+            return CANCELLED
+
+    def status(self, job_id: str):
+        with self._connect() as conn:
+            row = conn.execute("SELECT status FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return row["status"] if row else None
+
+    def get(self, job_id: str):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row else None
+
+    def depth(self) -> int:
+        """Number of jobs waiting or running."""
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+            ).fetchone()[0]
+
+    def average_duration(self, limit: int = 50):
+        """Mean run time in seconds of the most recent completed jobs, or None if there are none."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT AVG(finished_at - started_at) FROM (SELECT finished_at, started_at FROM jobs "
+                "WHERE status = ? AND started_at IS NOT NULL ORDER BY finished_at DESC LIMIT ?)",
+                (COMPLETED, limit),
+            ).fetchone()
+        return row[0]
+
+    # --- Worker side ---
+
+    def claim(self, worker_id: str, visibility_timeout: float = None):
+        """Lease the highest-priority ready job, or return None if there is none."""
+        visibility_timeout = visibility_timeout or DEFAULT_VISIBILITY_TIMEOUT
+        now = time.time()
+        with self._transaction() as conn:
+            # Expired leases that already used every attempt are dead, not retried
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = 'lease expired', finished_at = ?, lease_owner = NULL "
+                "WHERE status = ? AND lease_expires_at < ? AND attempts >= max_attempts",
+                (FAILED, now, RUNNING, now),
+            )
+            # Jobs whose deadline passed while waiting (or while their lease lapsed) are not worth starting
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = 'deadline passed before start', finished_at = ?, "
+                "lease_owner = NULL WHERE deadline IS NOT NULL AND deadline <= ? "
+                "AND (status = ? OR (status = ? AND lease_expires_at < ?))",
+                (FAILED, now, now, QUEUED, RUNNING, now),
+            )
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE (status = ? AND available_at <= ?) "
+                "OR (status = ? AND lease_expires_at < ?) "
+                "ORDER BY priority DESC, available_at, enqueued_at LIMIT 1",
+                (QUEUED, now, RUNNING, now),
+            ).fetchone()
+            if row is None:
+                return None
+
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_owner = ?, "
+                "lease_expires_at = ?, started_at = ? WHERE job_id = ?",
+                (RUNNING, worker_id, now + visibility_timeout, now, row["job_id"]),
+            )
+        return self.get(row["job_id"])
+
+    def heartbeat(self, job_id: str, worker_id: str, visibility_timeout: float = None) -> bool:
+        """Extend a lease. Returns False if the worker no longer owns the job."""
+        visibility_timeout = visibility_timeout or DEFAULT_VISIBILITY_TIMEOUT
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires_at = ? WHERE job_id = ? AND lease_owner = ? AND status = ?",
+                (time.time() + visibility_timeout, job_id, worker_id, RUNNING),
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job_id: str, worker_id: str, result) -> bool:
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = NULL, finished_at = ?, lease_owner = NULL "
+                "WHERE job_id = ? AND lease_owner = ? AND status = ?",
+                (COMPLETED, json.dumps(result), time.time(), job_id, worker_id, RUNNING),
+            )
+            return cursor.rowcount == 1
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool = True) -> str:
+        """
+        Record a failure; requeue with backoff if attempts remain (and `retry`).
+        Returns the new status, or None if the worker no longer owns the job.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE job_id = ? AND lease_owner = ? AND status = ?",
+                (job_id, worker_id, RUNNING),
+            ).fetchone()
+            if row is None:
+                return None
+
+            if retry and row["attempts"] < row["max_attempts"]:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, available_at = ?, lease_owner = NULL, "
+                    "lease_expires_at = NULL WHERE job_id = ?",
+                    (QUEUED, error, now + backoff_delay(row["attempts"]), job_id),
+                )
+                return QUEUED
+
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ?, lease_owner = NULL WHERE job_id = ?",
+                (FAILED, error, now, job_id),
+            )
+            return FAILED
+
+
+def _row_to_job(row) -> dict:
+    job = dict(row)
+    job["payload"] = json.loads(job["payload"])
+    job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+    return job
@@ -1,55 +1,170 @@
 import os
+import json
+import atexit
+import queue
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 
-def setup_logging(log_level=logging.INFO):
+# Background listener that owns the file handler (one per process)
+_listener = None
+
+# Default cap for payload summaries written to the log
+MAX_PAYLOAD_CHARS = int(os.getenv("LOG_MAX_PAYLOAD_CHARS", "500"))
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format records as one JSON object per line
+
+    Extra fields passed via `extra={...}` are included alongside the standard ones.
+    """
+
+    _RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+    def format(self, record):
+        payload = {
+            "time": self.formatTime(record),
+            "logger": record.name,
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in self._RESERVED:
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class PayloadSummary:
+    """
+    Lazily rendered, size-capped view of a request payload
+
+    Use as a logging argument (`logger.info("Input: %s", PayloadSummary(data))`)
+    so the payload is only stringified if the record is actually emitted.
+    """
+
+    def __init__(self, payload, max_chars=None):
+        self.payload = payload
+        self.max_chars = max_chars or MAX_PAYLOAD_CHARS
+
+    def __str__(self):
+        return summarize_payload(self.payload, self.max_chars)
+
+
+def summarize_payload(payload, max_chars=None):
+    """
+    Render a payload for logging, truncating long values
+
+    Args:
+        payload: Any object; dicts are summarized key by key
+        max_chars: Maximum length of the returned string
+
+    Returns:
+        A string of at most `max_chars` characters
+    """
+    max_chars = max_chars or MAX_PAYLOAD_CHARS
+    if isinstance(payload, dict):
+        per_value = max(16, max_chars // max(len(payload), 1))
+        parts = []
+        for key, value in payload.items():
+            text = repr(value)
+            if len(text) > per_value:
+                text = f"{text[:per_value]}…(+{len(text) - per_value} chars)"
+            parts.append(f"{key}={text}")
+        rendered = "{" + ", ".join(parts) + "}"
+    else:
+        rendered = repr(payload)
+
+    if len(rendered) > max_chars:
+        rendered = f"{rendered[:max_chars]}…(+{len(rendered) - max_chars} chars)"
+    return rendered
+
+
+def setup_logging(log_level=logging.INFO, json_format=None, log_name="app.log"):
     """
     Configure application-wide logging
-    
+
+    Records are put on an in-memory queue by the calling thread and written
+    to disk by a background QueueListener, so file I/O never happens on the
+    request path or inside the event loop.
+
     Args:
         log_level: The minimum log level to capture (default: INFO)
-    
+        json_format: Emit JSON lines instead of plain text
+                     (default: LOG_FORMAT=json environment variable)
+        log_name: File name under logs/; each process must use its own,
+                  since rotation is not safe across processes
+
     Returns:
         logger: Configured logger instance
     """
+    global _listener
+
+    if json_format is None:
+        json_format = os.getenv("LOG_FORMAT", "").lower() == "json"
+
     # Create logs directory if it doesn't exist
     log_directory = "logs"
     os.makedirs(log_directory, exist_ok=True)
-    log_file = os.path.join(log_directory, "app.log")
-    
+    log_file = os.path.join(log_directory, log_name)
+
     # Create formatter for consistent log formatting
-    file_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    
+    if json_format:
+        file_formatter = JsonFormatter()
+    else:
+        file_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
     # Set up rotating file handler (10 MB per file, keep 5 backup files)
     file_handler = RotatingFileHandler(
-        log_file, 
+        log_file,
         maxBytes=10*1024*1024,  # 10 MB
         backupCount=5
     )
     file_handler.setFormatter(file_formatter)
-    
+
+    # Restart the listener if logging is configured more than once
+    if _listener is not None:
+        _listener.stop()
+
+    log_queue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+    _listener.start()
+
     # Configure root logger
     root_logger = logging.getLogger()
     root_logger.setLevel(log_level)
-    
+
     # Remove any existing handlers to prevent duplicates
     for handler in root_logger.handlers[:]:
-        if isinstance(handler, logging.StreamHandler):
+        if isinstance(handler, (logging.StreamHandler, QueueHandler)):
             root_logger.removeHandler(handler)
-    
-    # Add the file handler
-    root_logger.addHandler(file_handler)
-    
+
+    # Add the non-blocking queue handler
+    root_logger.addHandler(QueueHandler(log_queue))
+
     return root_logger
 
+
+def shutdown_logging():
+    """Flush queued records and stop the background listener"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
 def get_logger(name):
     """
     Get a logger for a specific module
-    
+
     Args:
         name: Usually __name__ from the calling module
-        
+
     Returns:
         A logger instance with the specified name
     """
-    return logging.getLogger(name) 
\ No newline at end of file
+    return logging.getLogger(name)
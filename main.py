@@ -1,16 +1,24 @@
 import os
+import asyncio
 import uvicorn
 import uuid
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from fastapi import FastAPI, Query, HTTPException
+from fastapi import FastAPI, Query, HTTPException, Header, Response
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field, field_validator
 from masumi.config import Config
 from masumi.payment import Payment, Amount
-from crew_definition import AuditSenseCrew  # ← updated import
-from logging_config import setup_logging
+from standards.catalog import UnknownStandardError, list_standards, resolve_standard_id
+from job_queue import JobQueue, COMPLETED, FAILED, CANCELLED
+from cancellation import JobCancelled, deadline_from_submit_result_time
+from admission import AdmissionController, count_awaiting_payment, expire_unpaid_jobs
+from result_store import ResultStore, ResultNotFound, select_report, view_etag, etag_matches, DEFAULT_PAGE_SIZE
+from logging_config import setup_logging, get_logger, PayloadSummary
 
-# Configure logging
-logger = setup_logging()
+# Handlers are attached in lifespan() / the CLI entry points, not at import:
+# spawned worker processes re-import this module and log to their own files
+logger = get_logger("auditsense.api")
 
 # Load environment variables
 load_dotenv(override=True)
@@ -21,18 +29,33 @@ PAYMENT_SERVICE_URL = os.getenv("PAYMENT_SERVICE_URL")
 PAYMENT_API_KEY = os.getenv("PAYMENT_API_KEY")
 NETWORK = os.getenv("NETWORK")
 
-logger.info("Starting application with configuration:")
-logger.info(f"PAYMENT_SERVICE_URL: {PAYMENT_SERVICE_URL}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """API process startup: logging, the job queue and admission control."""
+    global job_queue, admission, result_store
+    setup_logging()
+    logger.info("Starting application with configuration:")
+    logger.info("PAYMENT_SERVICE_URL: %s", PAYMENT_SERVICE_URL)
+
+    job_queue = JobQueue()
+    admission = AdmissionController(job_queue)
+    result_store = ResultStore()
+    yield
+
 
 # Initialize FastAPI
 app = FastAPI(
     title="AuditSense API (Masumi Compatible)",
     description="API for running AuditSense compliance agent pipeline with Masumi payment integration",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Temporary in-memory job store (DO NOT USE IN PRODUCTION)
+# Payment state lives only here: jobs paid before an API restart still run in
+# the workers, but their results are not submitted via complete_payment.
 # ─────────────────────────────────────────────────────────────────────────────
 jobs = {}
 payment_instances = {}
@@ -45,6 +68,16 @@ config = Config(
     payment_api_key=PAYMENT_API_KEY
 )
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Durable job queue (crew runs happen in worker processes, see worker.py)
+# Created in lifespan() so worker processes importing this module skip them
+# ─────────────────────────────────────────────────────────────────────────────
+job_queue = None
+admission = None
+result_store = None
+API_JOB_PRIORITY = int(os.getenv("AUDITSENSE_API_JOB_PRIORITY", "10"))
+QUEUE_POLL_INTERVAL = float(os.getenv("AUDITSENSE_QUEUE_POLL_INTERVAL", "2.0"))
+
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Pydantic Models
@@ -71,20 +104,34 @@ class ProvideInputRequest(BaseModel):
     job_id: str
 
 
+class CancelJobRequest(BaseModel):
+    job_id: str
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # CrewAI Task Execution
 # ─────────────────────────────────────────────────────────────────────────────
-async def execute_crew_task(input_data: dict) -> str:
-    """ Execute the AuditSense CrewAI pipeline """
-    logger.info(f"Starting AuditSense CrewAI task with input: {input_data}")
-
-    crew = AuditSenseCrew(logger=logger)  # ← class-based usage
-
-    # IMPORTANT: AuditSenseCrew stores Crew instance as crew.crew
-    result = crew.crew.kickoff(inputs=input_data)
-
-    logger.info("AuditSense pipeline completed successfully")
-    return result
+async def execute_crew_task(job_id: str, input_data: dict, deadline: float = None) -> str:
+    """
+    Queue the AuditSense pipeline for a worker process; returns the stored report's ETag.
+    Workers abandon the job once `deadline` (epoch seconds) passes.
+    """
+    logger.info("Queueing AuditSense CrewAI task with input: %s", PayloadSummary(input_data))
+
+    await asyncio.to_thread(job_queue.enqueue, job_id, input_data, API_JOB_PRIORITY, None, deadline)
+
+    while True:
+        job = await asyncio.to_thread(job_queue.get, job_id)
+        if job is None:
+            raise RuntimeError(f"Job {job_id} is no longer in the queue")
+        if job["status"] == COMPLETED:
+            logger.info("AuditSense pipeline completed successfully")
+            return job["result"]["etag"]
+        if job["status"] == FAILED:
+            raise RuntimeError(f"AuditSense pipeline failed after {job['attempts']} attempts: {job['error']}")
+        if job["status"] == CANCELLED:
+            raise JobCancelled(job_id)
+        await asyncio.sleep(QUEUE_POLL_INTERVAL)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -93,23 +140,51 @@ async def execute_crew_task(input_data: dict) -> str:
 @app.post("/start_job")
 async def start_job(data: StartJobRequest):
     """ Initiates a job and creates a payment request """
-    print(f"Received data: {data}")
-    print(f"Received data.input_data: {data.input_data}")
+    logger.debug("Received start_job input_data: %s", PayloadSummary(data.input_data))
+
+    # Reject unknown catalog ids before the purchaser is asked to pay
+    standard_id = data.input_data.get("standard_id")
+    if standard_id:
+        try:
+            resolve_standard_id(standard_id)
+        except UnknownStandardError:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown standard_id '{standard_id}'. See GET /standards for available ids."
+            )
+
+    # Admission control runs before any payment request is created
+    # Payment requests past their payByTime no longer hold a queue slot
+    for expired_id in expire_unpaid_jobs(jobs):
+        logger.info("Payment window expired for job %s", expired_id)
+        payment = payment_instances.pop(expired_id, None)
+        if payment is not None:
+            payment.stop_status_monitoring()
+    pending_jobs = count_awaiting_payment(jobs)
+    decision = await asyncio.to_thread(admission.admit, data.identifier_from_purchaser, pending_jobs)
+    if not decision.allowed:
+        logger.warning("Rejected job for %s: %s", data.identifier_from_purchaser, decision.reason)
+        return JSONResponse(
+            status_code=decision.status_code,
+            content={"status": "error", "detail": decision.reason, "retry_after": decision.retry_after},
+            headers=decision.headers(),
+        )
+
     try:
         job_id = str(uuid.uuid4())
         agent_identifier = os.getenv("AGENT_IDENTIFIER")
 
         source_url = data.input_data.get("source_url")
         standard_url = data.input_data.get("standard_url")
-        logger.info(f"Received job request for Standard URL: {standard_url}")
-        logger.info(f"Evidence document URL: {source_url}")
-        logger.info(f"Starting job {job_id} with agent {agent_identifier}")
+        logger.info("Received job request for Standard ID: %s, URL: %s", data.input_data.get("standard_id"), standard_url)
+        logger.info("Evidence document URL: %s", source_url)
+        logger.info("Starting job %s with agent %s", job_id, agent_identifier)
 
         payment_amount = os.getenv("PAYMENT_AMOUNT", "10000000")
         payment_unit = os.getenv("PAYMENT_UNIT", "lovelace")
 
         amounts = [Amount(amount=payment_amount, unit=payment_unit)]
-        logger.info(f"Using payment amount: {payment_amount} {payment_unit}")
+        logger.info("Using payment amount: %s %s", payment_amount, payment_unit)
 
         payment = Payment(
             agent_identifier=agent_identifier,
@@ -123,14 +198,16 @@ async def start_job(data: StartJobRequest):
         payment_request = await payment.create_payment_request()
         blockchain_identifier = payment_request["data"]["blockchainIdentifier"]
         payment.payment_ids.add(blockchain_identifier)
-        logger.info(f"Created payment request with blockchain identifier: {blockchain_identifier}")
+        logger.info("Created payment request with blockchain identifier: %s", blockchain_identifier)
 
         jobs[job_id] = {
             "status": "awaiting_payment",
             "payment_status": "pending",
             "blockchain_identifier": blockchain_identifier,
             "input_data": data.input_data,
-            "result": None,
+            "result_etag": None,
+            "deadline": deadline_from_submit_result_time(payment_request["data"].get("submitResultTime")),
+            "pay_by": deadline_from_submit_result_time(payment_request["data"].get("payByTime"), margin=0),
             "identifier_from_purchaser": data.identifier_from_purchaser
         }
 
@@ -138,7 +215,7 @@ async def start_job(data: StartJobRequest):
             await handle_payment_status(job_id, blockchain_identifier)
 
         payment_instances[job_id] = payment
-        logger.info(f"Starting payment status monitoring for job {job_id}")
+        logger.info("Starting payment status monitoring for job %s", job_id)
         await payment.start_status_monitoring(payment_callback)
 
         return {
@@ -156,7 +233,7 @@ async def start_job(data: StartJobRequest):
             "payByTime": payment_request["data"]["payByTime"],
         }
     except Exception as e:
-        logger.error(f"Error in start_job: {str(e)}", exc_info=True)
+        logger.error("Error in start_job: %s", e, exc_info=True)
         raise HTTPException(
             status_code=400,
             detail="Input_data or identifier_from_purchaser is missing or invalid."
@@ -168,30 +245,41 @@ async def start_job(data: StartJobRequest):
 # ─────────────────────────────────────────────────────────────────────────────
 async def handle_payment_status(job_id: str, payment_id: str) -> None:
     """ Executes AuditSense CrewAI after payment confirmation """
+    if jobs[job_id]["status"] == "cancelled":
+        return
+
     try:
-        logger.info(f"Payment {payment_id} completed for job {job_id}, executing AuditSense pipeline...")
+        logger.info("Payment %s completed for job %s, executing AuditSense pipeline...", payment_id, job_id)
 
         jobs[job_id]["status"] = "running"
-        logger.info(f"Input data: {jobs[job_id]['input_data']}")
+        logger.info("Input data: %s", PayloadSummary(jobs[job_id]["input_data"]))
 
-        result = await execute_crew_task(jobs[job_id]["input_data"])
-        logger.info(f"Crew task completed for job {job_id}")
+        result_etag = await execute_crew_task(job_id, jobs[job_id]["input_data"], jobs[job_id].get("deadline"))
+        logger.info("Crew task completed for job %s", job_id)
 
-        result_string = result.raw if hasattr(result, "raw") else str(result)
+        # The report lives compressed in the result store; only its ETag is kept in memory
+        result_string = await asyncio.to_thread(result_store.load_raw, job_id)
 
         await payment_instances[job_id].complete_payment(payment_id, result_string)
-        logger.info(f"Payment completed for job {job_id}")
+        logger.info("Payment completed for job %s", job_id)
 
         jobs[job_id]["status"] = "completed"
         jobs[job_id]["payment_status"] = "completed"
-        jobs[job_id]["result"] = result
+        jobs[job_id]["result_etag"] = result_etag
 
         if job_id in payment_instances:
             payment_instances[job_id].stop_status_monitoring()
             del payment_instances[job_id]
 
+    except JobCancelled:
+        logger.info("Job %s was cancelled before its result was submitted", job_id)
+        jobs[job_id]["status"] = "cancelled"
+        if job_id in payment_instances:
+            payment_instances[job_id].stop_status_monitoring()
+            del payment_instances[job_id]
+
     except Exception as e:
-        print(f"Error processing payment {payment_id} for job {job_id}: {str(e)}")
+        logger.error("Error processing payment %s for job %s: %s", payment_id, job_id, e, exc_info=True)
         jobs[job_id]["status"] = "failed"
         jobs[job_id]["error"] = str(e)
         if job_id in payment_instances:
@@ -203,9 +291,9 @@ async def handle_payment_status(job_id: str, payment_id: str) -> None:
 # 3) Check Job Status
 # ─────────────────────────────────────────────────────────────────────────────
 @app.get("/status")
-async def get_status(job_id: str):
-    """ Retrieves the current status of a specific job """
-    logger.info(f"Checking status for job {job_id}")
+async def get_status(job_id: str, response: Response, if_none_match: str | None = Header(default=None)):
+    """ Retrieves the current status of a specific job (supports If-None-Match) """
+    logger.debug("Checking status for job %s", job_id)
     if job_id not in jobs:
         raise HTTPException(status_code=404, detail="Job not found")
 
@@ -218,8 +306,14 @@ async def get_status(job_id: str):
         except:
             job["payment_status"] = "unknown"
 
-    result_data = job.get("result")
-    result = result_data.raw if result_data and hasattr(result_data, "raw") else None
+    etag = view_etag(job.get("result_etag") or "none", job["status"], job["payment_status"])
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
+    result = None
+    if job.get("result_etag"):
+        result = await asyncio.to_thread(result_store.load_raw, job_id)
 
     return {
         "job_id": job_id,
@@ -229,6 +323,56 @@ async def get_status(job_id: str):
     }
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# 3a) Cancel Job
+# ─────────────────────────────────────────────────────────────────────────────
+@app.post("/cancel_job")
+async def cancel_job(data: CancelJobRequest):
+    """ Cancels a job awaiting payment, queued or running; its worker slot is freed right away """
+    job = jobs.get(data.job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] in ("completed", "failed", "cancelled", "payment_expired"):
+        raise HTTPException(status_code=409, detail=f"Job already {job['status']}")
+
+    await asyncio.to_thread(job_queue.cancel, data.job_id)
+    job["status"] = "cancelled"
+    if data.job_id in payment_instances:
+        payment_instances[data.job_id].stop_status_monitoring()
+        del payment_instances[data.job_id]
+
+    logger.info("Cancelled job %s", data.job_id)
+    return {"status": "success", "job_id": data.job_id, "job_status": "cancelled"}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 3b) Report Retrieval (field selection + pagination + ETag)
+# ─────────────────────────────────────────────────────────────────────────────
+@app.get("/report")
+async def get_report(
+    job_id: str,
+    response: Response,
+    fields: str | None = Query(default=None, description="Comma-separated top-level report fields"),
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1),
+    if_none_match: str | None = Header(default=None),
+):
+    """ Returns a page of a completed report; evaluations and domain_scores are paginated """
+    try:
+        stored_etag = await asyncio.to_thread(result_store.etag, job_id)
+    except ResultNotFound:
+        raise HTTPException(status_code=404, detail="Report not found")
+
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    etag = view_etag(stored_etag, field_list, offset, limit)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    report = await asyncio.to_thread(result_store.load, job_id)
+    response.headers["ETag"] = etag
+    return select_report(report, field_list, offset, limit)
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # 4) Availability
 # ─────────────────────────────────────────────────────────────────────────────
@@ -245,12 +389,28 @@ async def input_schema():
     """ AuditSense-specific input schema """
     return {
         "input_data": [
+            {
+                "id": "standard_id",
+                "type": "string",
+                "name": "Catalog Standard ID",
+                "data": {
+                    "description": (
+                        "ID of a precompiled standard from the local catalog; skips fetching and "
+                        "extraction. Available: "
+                        + ", ".join(s["standard_id"] for s in list_standards())
+                    ),
+                    "placeholder": "iso27001-2022"
+                }
+            },
             {
                 "id": "standard_url",
                 "type": "string",
                 "name": "Compliance Standard URL",
                 "data": {
-                    "description": "URL containing a compliance standard (ISO, SOC2, PCI, GDPR, RBI...)",
+                    "description": (
+                        "URL containing a compliance standard (ISO, SOC2, PCI, GDPR, RBI...). "
+                        "Not needed when standard_id is set."
+                    ),
                     "placeholder": "https://example.com/iso27001.txt"
                 }
             },
@@ -286,11 +446,20 @@ async def input_schema():
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-# 6) Health Check
+# 6) Standards Catalog
+# ─────────────────────────────────────────────────────────────────────────────
+@app.get("/standards")
+async def standards():
+    """ Precompiled standards usable via input_data.standard_id """
+    return {"standards": list_standards()}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 7) Health Check
 # ─────────────────────────────────────────────────────────────────────────────
 @app.get("/health")
 async def health():
-    return {"status": "healthy"}
+    return {"status": "healthy", "queue_depth": await asyncio.to_thread(job_queue.depth)}
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -300,6 +469,8 @@ def main():
     """Run AuditSense pipeline without API"""
     import os
     os.environ['CREWAI_DISABLE_TELEMETRY'] = 'true'
+    from crew_definition import AuditSenseCrew  # heavy; only the standalone run needs it in this process
+    setup_logging()
 
     print("\n" + "=" * 70)
     print("🚀 Running AuditSense agents locally (standalone mode)...")
@@ -341,19 +512,47 @@ def main():
 if __name__ == "__main__":
     import sys
 
-    if len(sys.argv) > 1 and sys.argv[1] == "api":
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        # Offline bulk audits from a manifest (no HTTP, no payment flow)
+        from batch_runner import main as batch_main
+
+        sys.exit(batch_main(sys.argv[2:]))
+
+    elif len(sys.argv) > 1 and sys.argv[1] == "worker":
+        # Standalone worker pool consuming the shared job queue
+        from worker import start_workers, stop_workers
+
+        count = int(sys.argv[2]) if len(sys.argv) > 2 else None
+        processes, stop_event = start_workers(count)
+        print(f"🚀 Started {len(processes)} AuditSense worker process(es). Ctrl+C to stop.")
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            stop_workers(processes, stop_event)
+
+    elif len(sys.argv) > 1 and sys.argv[1] == "api":
+        from worker import start_workers, stop_workers
+
         port = int(os.environ.get("API_PORT", 8000))
         host = os.environ.get("API_HOST", "127.0.0.1")
 
+        # AUDITSENSE_WORKERS=0 runs the API only (workers started via `python main.py worker`)
+        processes, stop_event = start_workers()
+
         print("\n" + "=" * 70)
         print("🚀 Starting AuditSense FastAPI server with Masumi integration...")
         print("=" * 70)
         print(f"API Documentation:        http://{host}:{port}/docs")
         print(f"Availability Check:       http://{host}:{port}/availability")
         print(f"Status Check:             http://{host}:{port}/status")
-        print(f"Input Schema:             http://{host}:{port}/input_schema\n")
+        print(f"Input Schema:             http://{host}:{port}/input_schema")
+        print(f"Worker processes:         {len(processes)}\n")
         print("=" * 70 + "\n")
 
-        uvicorn.run(app, host=host, port=port, log_level="info")
+        try:
+            uvicorn.run(app, host=host, port=port, log_level="info")
+        finally:
+            stop_workers(processes, stop_event)
     else:
         main()
@@ -0,0 +1,105 @@
+# model_routing.py
+# Single place that decides which model each pipeline stage uses.
+# Stages run on the small tier by default; evidence mapping is re-run on the
+# strong tier only for evaluations the small model was not confident about.
+
+import os
+import threading
+from functools import lru_cache
+
+# Model per tier (LiteLLM-style "provider/model" names)
+TIER_MODELS = {
+    "small": os.getenv("AUDITSENSE_SMALL_MODEL", "openai/gpt-5-nano"),
+    "strong": os.getenv("AUDITSENSE_STRONG_MODEL", "openai/gpt-5-mini"),
+}
+
+# USD per 1M (input, output) tokens, used for cost accounting only
+TIER_PRICES = {
+    "small": (
+        float(os.getenv("AUDITSENSE_SMALL_PRICE_IN", "0.05")),
+        float(os.getenv("AUDITSENSE_SMALL_PRICE_OUT", "0.40")),
+    ),
+    "strong": (
+        float(os.getenv("AUDITSENSE_STRONG_PRICE_IN", "0.25")),
+        float(os.getenv("AUDITSENSE_STRONG_PRICE_OUT", "2.00")),
+    ),
+}
+
+STAGE_TIERS = {
+    "extraction": "small",
+    "loading": "small",
+    "mapping": "small",
+    "escalation": "strong",
+    "report": "small",
+}
+
+# Mapper evaluations below this confidence are re-mapped on the strong tier
+ESCALATION_CONFIDENCE = float(os.getenv("AUDITSENSE_ESCALATION_CONFIDENCE", "0.6"))
+
+VALID_COVERAGE = {"covered", "partially_covered", "not_covered"}
+
+
+@lru_cache(maxsize=None)
+def tier_for_stage(stage: str) -> str:
+    """Resolve a stage's tier once; AUDITSENSE_<STAGE>_TIER overrides the default."""
+    return os.getenv(f"AUDITSENSE_{stage.upper()}_TIER", STAGE_TIERS[stage])
+
+
+@lru_cache(maxsize=None)
+def get_llm(tier: str):
+    """One shared LLM client per tier."""
+    from crewai import LLM
+
+    return LLM(model=TIER_MODELS[tier])
+
+
+def llm_for_stage(stage: str):
+    return get_llm(tier_for_stage(stage))
+
+
+def is_low_confidence(evaluation: dict, threshold: float = None) -> bool:
+    """True if a mapper evaluation should be escalated to the strong tier."""
+    threshold = ESCALATION_CONFIDENCE if threshold is None else threshold
+    if evaluation.get("coverage") not in VALID_COVERAGE:
+        return True
+    try:
+        confidence = float(evaluation.get("confidence"))
+    except (TypeError, ValueError):
+        return True
+    return confidence < threshold
+
+
+class TierStats:
+    """Accumulates calls, latency, tokens and cost per tier (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, tier: str, seconds: float, prompt_tokens: int = 0, completion_tokens: int = 0):
+        price_in, price_out = TIER_PRICES.get(tier, (0.0, 0.0))
+        cost = (prompt_tokens * price_in + completion_tokens * price_out) / 1_000_000
+        with self._lock:
+            entry = self._stats.setdefault(tier, {
+                "calls": 0, "seconds": 0.0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0,
+            })
+            entry["calls"] += 1
+            entry["seconds"] += seconds
+            entry["prompt_tokens"] += prompt_tokens
+            entry["completion_tokens"] += completion_tokens
+            entry["cost_usd"] += cost
+
+    def merge(self, other: "TierStats") -> None:
+        for tier, entry in other.snapshot().items():
+            with self._lock:
+                totals = self._stats.setdefault(tier, {key: 0 for key in entry})
+                for key, value in entry.items():
+                    totals[key] += value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {tier: dict(entry) for tier, entry in self._stats.items()}
+
+
+# Process-wide totals across all runs
+tier_stats = TierStats()
@@ -0,0 +1,2 @@
+# pipeline/__init__.py
+# Local (non-LLM) processing stages used by AuditSenseCrew between agent tasks
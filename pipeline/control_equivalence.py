@@ -0,0 +1,143 @@
+# pipeline/control_equivalence.py
+
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from pipeline.prescreen import TfidfIndex, control_text
+from pipeline.text_store import text_digest
+
+DEFAULT_DB_PATH = os.getenv("AUDITSENSE_EVALUATION_DB", os.path.join("state", "evaluations.db"))
+
+# Similarity at or above which a stored evaluation is reused as-is
+REUSE_THRESHOLD = float(os.getenv("AUDITSENSE_REUSE_THRESHOLD", "0.8"))
+# Similarity at or above which a stored evaluation is passed to the mapper as a hint
+SEED_THRESHOLD = float(os.getenv("AUDITSENSE_SEED_THRESHOLD", "0.5"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS evaluations (
+    evidence_hash TEXT NOT NULL,
+    standard_key  TEXT NOT NULL,
+    control_id    TEXT NOT NULL,
+    control_text  TEXT NOT NULL,
+    evaluation    TEXT NOT NULL,
+    created_at    REAL NOT NULL,
+    PRIMARY KEY (evidence_hash, standard_key, control_id)
+);
+"""
+
+
+def documents_hash(documents: dict) -> str:
+    """Stable hash of an evidence set (doc ids and their text, as `str` or stored views)."""
+    digest = hashlib.sha256()
+    for doc_id in sorted(documents):
+        digest.update(str(doc_id).encode("utf-8") + b"\0")
+        digest.update(text_digest(documents[doc_id]))
+    return digest.hexdigest()
+
+
+@dataclass
+class ReuseResult:
+    reused: list = field(default_factory=list)     # evaluations copied from equivalent controls
+    to_map: list = field(default_factory=list)     # controls still needing the mapper (maybe seeded)
+
+
+class ControlEquivalenceIndex:
+    """
+    Evaluations of past runs, keyed by evidence hash, with a similarity index
+    over control titles/descriptions so equivalent controls of another
+    standard (e.g. ISO A.8.13 ↔ NIST CP-9) can reuse or seed an evaluation.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or DEFAULT_DB_PATH
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _stored(self, evidence_hash: str) -> list:
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT standard_key, control_id, control_text, evaluation FROM evaluations "
+                "WHERE evidence_hash = ?", (evidence_hash,),
+            ).fetchall()
+
+    def lookup(self, controls: list, evidence_hash: str,
+               reuse_threshold: float = None, seed_threshold: float = None) -> ReuseResult:
+        reuse_threshold = REUSE_THRESHOLD if reuse_threshold is None else reuse_threshold
+        seed_threshold = SEED_THRESHOLD if seed_threshold is None else seed_threshold
+        result = ReuseResult()
+
+        stored = self._stored(evidence_hash)
+        if not stored:
+            result.to_map = list(controls)
+            return result
+
+        index = TfidfIndex.from_documents({str(i): row[2] for i, row in enumerate(stored)})
+
+        for control in controls:
+            matches = index.query(control_text(control), top_k=1)
+            if not matches:
+                result.to_map.append(control)
+                continue
+
+            score, key, _, _ = matches[0]
+            standard_key, control_id, _, evaluation_json = stored[int(key)]
+            evaluation = json.loads(evaluation_json)
+            source = {"standard": standard_key, "control_id": control_id, "similarity": round(score, 3)}
+
+            if score >= reuse_threshold:
+                reused = copy.deepcopy(evaluation)
+                reused["control_id"] = control.get("id")
+                if control.get("domain"):
+                    reused["domain"] = control["domain"]
+                reused["reused_from"] = source
+                result.reused.append(reused)
+            elif score >= seed_threshold:
+                seeded = dict(control)
+                seeded["related_evaluation"] = {
+                    **source,
+                    "coverage": evaluation.get("coverage"),
+                    "notes": evaluation.get("notes"),
+                }
+                result.to_map.append(seeded)
+            else:
+                result.to_map.append(control)
+
+        return result
+
+    def record(self, standard_key: str, controls: list, evaluations: list, evidence_hash: str) -> int:
+        """Store mapper evaluations (not reused copies) for future runs. Returns rows written."""
+        by_id = {c.get("id"): c for c in controls}
+        rows = []
+        for evaluation in evaluations:
+            control = by_id.get(evaluation.get("control_id"))
+            if control is None or evaluation.get("reused_from") or evaluation.get("prescreened"):
+                continue
+            rows.append((
+                evidence_hash, standard_key or "", str(control.get("id")), control_text(control),
+                json.dumps(evaluation), time.time(),
+            ))
+        if rows:
+            with self._connect() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO evaluations VALUES (?, ?, ?, ?, ?, ?)", rows
+                )
+        return len(rows)
@@ -0,0 +1,201 @@
+# pipeline/domain_partition.py
+
+import os
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+# Larger domains are split so no single mapper call outgrows the context window
+MAX_PARTITION_CONTROLS = int(os.getenv("AUDITSENSE_MAX_PARTITION_CONTROLS", "40"))
+# Deadline-aware runs map high-priority controls first, in batches this small,
+# so a batch cut off by the deadline loses few of them
+PRIORITY_BATCH_CONTROLS = int(os.getenv("AUDITSENSE_PRIORITY_BATCH_CONTROLS", "5"))
+KEY_GAPS_PER_DOMAIN = 5
+
+COVERAGE_SCORES = {"covered": 1.0, "partially_covered": 0.5, "not_covered": 0.0}
+PRIORITY_ORDER = {"high": 0, "medium": 1, "low": 2}
+
+_NIST_ID_RE = re.compile(r"^([A-Za-z]{2,4})-\d")
+
+
+def control_domain(control: dict) -> str:
+    """The control's `domain`, else a family derived from its id (AC-2 → AC, A.5.1 → A.5)."""
+    if control.get("domain"):
+        return str(control["domain"])
+    control_id = str(control.get("id") or "")
+    match = _NIST_ID_RE.match(control_id)
+    if match:
+        return match.group(1).upper()
+    parts = control_id.split(".")
+    if len(parts) > 2:
+        return ".".join(parts[:2])
+    return "General"
+
+
+def priority_rank(control: dict) -> int:
+    return PRIORITY_ORDER.get(str(control.get("priority")).lower(), 1)
+
+
+def partition_controls(controls: list, max_size: int = None) -> list:
+    """
+    Group controls by domain, keeping first-seen order, and split any domain
+    larger than `max_size`. Returns a list of (domain, controls) partitions.
+    """
+    max_size = max_size or MAX_PARTITION_CONTROLS
+    by_domain = OrderedDict()
+    for control in controls:
+        by_domain.setdefault(control_domain(control), []).append(control)
+
+    partitions = []
+    for domain, members in by_domain.items():
+        for start in range(0, len(members), max_size):
+            partitions.append((domain, members[start:start + max_size]))
+    return partitions
+
+
+def coverage_score(evaluation: dict) -> float:
+    return COVERAGE_SCORES.get(evaluation.get("coverage"), 0.0)
+
+
+def score_domain(domain: str, controls: list, evaluations: list) -> dict:
+    """Deterministic per-domain score in the `audit_report_task` domain_scores shape."""
+    by_id = {e.get("control_id"): e for e in evaluations}
+    counts = {"covered": 0, "partially_covered": 0, "not_covered": 0}
+    gaps = []
+    total = 0.0
+    scored = 0
+
+    # High-priority controls first, so their gaps are the ones kept
+    ordered = sorted(controls, key=priority_rank)
+    for control in ordered:
+        evaluation = by_id.get(control.get("id"))
+        if evaluation is None:
+            continue
+        coverage = evaluation.get("coverage")
+        counts[coverage if coverage in counts else "not_covered"] += 1
+        total += coverage_score(evaluation)
+        scored += 1
+        if coverage != "covered":
+            missing = evaluation.get("missing_elements") or [control.get("title") or control.get("id")]
+            gaps.extend(f"{control.get('id')}: {item}" for item in missing)
+
+    return {
+        "domain": domain,
+        "score": round(total / scored, 2) if scored else 0.0,
+        "covered": counts["covered"],
+        "partial": counts["partially_covered"],
+        "missing": counts["not_covered"],
+        "key_gaps": gaps[:KEY_GAPS_PER_DOMAIN],
+    }
+
+
+def prioritize_partitions(controls: list, max_size: int = None, batch_size: int = None) -> list:
+    """
+    Partitions for deadline-aware runs: high-priority controls come first,
+    per domain in batches of `batch_size` of their own, followed by the
+    rest partitioned as usual, medium-priority domains before low ones.
+    """
+    batch_size = batch_size or PRIORITY_BATCH_CONTROLS
+    high = [c for c in controls if priority_rank(c) == 0]
+    rest = [c for c in controls if priority_rank(c) != 0]
+    others = partition_controls(sorted(rest, key=priority_rank), max_size)
+    return partition_controls(high, batch_size) + sorted(others, key=lambda p: min(map(priority_rank, p[1])))
+
+
+@dataclass
+class MappingResult:
+    evaluations: list = field(default_factory=list)     # in control order
+    domain_scores: list = field(default_factory=list)
+    unevaluated: list = field(default_factory=list)     # control ids skipped for lack of time
+
+
+def merge_domain_scores(partial_scores: list) -> list:
+    """Combine scores of a domain that was split into several partitions."""
+    merged = OrderedDict()
+    for entry in partial_scores:
+        current = merged.get(entry["domain"])
+        if current is None:
+            merged[entry["domain"]] = dict(entry, key_gaps=list(entry["key_gaps"]))
+            continue
+        before = current["covered"] + current["partial"] + current["missing"]
+        added = entry["covered"] + entry["partial"] + entry["missing"]
+        if before + added:
+            current["score"] = round((current["score"] * before + entry["score"] * added) / (before + added), 2)
+        for key in ("covered", "partial", "missing"):
+            current[key] += entry[key]
+        current["key_gaps"] = (current["key_gaps"] + entry["key_gaps"])[:KEY_GAPS_PER_DOMAIN]
+    return list(merged.values())
+
+
+def overall_readiness(evaluations: list) -> float:
+    if not evaluations:
+        return 0.0
+    return round(sum(coverage_score(e) for e in evaluations) / len(evaluations), 2)
+
+
+def mapped_readiness(evaluations: list):
+    """
+    Readiness of only the controls the mapper (or an equivalent earlier run)
+    evaluated, leaving out pre-screened not_covered ones. Reported next to
+    overall_readiness in partial reports; None if nothing was mapped.
+    """
+    mapped = [e for e in evaluations if not e.get("prescreened")]
+    return overall_readiness(mapped) if mapped else None
+
+
+def gap_digest(domain_scores: list) -> list:
+    """Compact per-domain view handed to the report LLM instead of every evaluation."""
+    return [
+        {"domain": d["domain"], "score": d["score"], "missing": d["missing"], "key_gaps": d["key_gaps"]}
+        for d in sorted(domain_scores, key=lambda d: d["score"])
+    ]
+
+
+def local_summary(evaluations: list, domain_scores: list, unevaluated: list = None) -> dict:
+    """Summary and recommendations without an LLM, for when the report model has no time left."""
+    unevaluated = unevaluated or []
+    total = len(evaluations) + len(unevaluated)
+    text = f"Overall readiness {overall_readiness(evaluations):.0%} across {len(evaluations)} evaluated controls"
+    if unevaluated:
+        mapped = mapped_readiness(evaluations)
+        if mapped is None:
+            text += "; none were mapped to evidence before the deadline"
+        else:
+            text += f" ({mapped:.0%} for controls mapped to evidence)"
+        text += f" (partial assessment: {len(unevaluated)} of {total} controls were not evaluated before the deadline)"
+    weakest = [d for d in gap_digest(domain_scores) if d["key_gaps"]][:5]
+    if weakest:
+        text += ". Weakest domains: " + ", ".join(f"{d['domain']} ({d['score']:.0%})" for d in weakest)
+    recommendations = [f"Close gaps in {d['domain']}: " + "; ".join(d["key_gaps"][:3]) for d in weakest]
+    if unevaluated:
+        recommendations.append("Re-run the audit to evaluate the remaining controls.")
+    return {"overall_summary": text + ".", "global_recommendations": recommendations}
+
+
+def build_report(standard_name: str, scope: str, evaluations: list, domain_scores: list,
+                 summary: dict = None, unevaluated: list = None) -> dict:
+    """
+    Assemble the final report in the `audit_report_task` structure.
+
+    overall_readiness always covers every evaluated control. Reports missing
+    some controls (`unevaluated`) are marked `partial`, list the control ids
+    that were not evaluated, and add `mapped_readiness` (see mapped_readiness).
+    """
+    summary = summary if isinstance(summary, dict) else {}
+    report = {
+        "standard_name": standard_name,
+        "scope": scope,
+        "overall_readiness": overall_readiness(evaluations),
+        "overall_summary": summary.get("overall_summary", ""),
+        "domain_scores": domain_scores,
+        "evaluations": evaluations,
+        "global_recommendations": summary.get("global_recommendations", []),
+        "partial": bool(unevaluated),
+    }
+    if unevaluated:
+        report["evaluated_controls"] = len(evaluations)
+        report["total_controls"] = len(evaluations) + len(unevaluated)
+        report["unevaluated_controls"] = list(unevaluated)
+        report["prescreened_controls"] = sum(1 for e in evaluations if e.get("prescreened"))
+        report["mapped_readiness"] = mapped_readiness(evaluations)
+    return report
@@ -0,0 +1,41 @@
+# pipeline/parsing.py
+
+import ast
+import json
+import re
+
+_FENCE_RE = re.compile(r"^```[a-zA-Z]*\s*|\s*```$")
+
+
+def parse_task_output(raw: str):
+    """
+    Parse an agent's raw answer into Python data.
+
+    Agents are asked for "a Python dict/list", so answers arrive as JSON,
+    Python literals, or either wrapped in a markdown code fence.
+    Raises ValueError if nothing parseable is found.
+    """
+    text = _FENCE_RE.sub("", (raw or "").strip())
+
+    for candidate in (text, _outermost_literal(text)):
+        if not candidate:
+            continue
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            pass
+        try:
+            return ast.literal_eval(candidate)
+        except (ValueError, SyntaxError):
+            pass
+
+    raise ValueError("Agent output is not a valid JSON or Python literal")
+
+
+def _outermost_literal(text: str) -> str:
+    starts = [i for i in (text.find("["), text.find("{")) if i != -1]
+    if not starts:
+        return ""
+    start = min(starts)
+    end = text.rfind("]" if text[start] == "[" else "}")
+    return text[start:end + 1] if end > start else ""
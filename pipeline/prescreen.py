@@ -0,0 +1,258 @@
+# pipeline/prescreen.py
+
+import heapq
+import math
+import os
+import re
+from array import array
+from collections import Counter
+from dataclasses import dataclass, field
+
+from pipeline.text_store import iter_matches
+
+DEFAULT_THRESHOLD = float(os.getenv("AUDITSENSE_PRESCREEN_THRESHOLD", "0.05"))
+
+PASSAGE_WORDS = 120
+PASSAGE_STRIDE = 60
+
+# Evidence the mapper sees per call; larger documents are cut down to their best passages
+MAPPER_CONTEXT_CHARS = int(os.getenv("AUDITSENSE_MAPPER_CONTEXT_CHARS", "60000"))
+EXCERPT_PASSAGES_PER_CONTROL = 3
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_WORD_RE = re.compile(r"\S+")
+
+STOPWORDS = {
+    "the", "and", "for", "are", "shall", "should", "must", "with", "that", "this",
+    "from", "all", "any", "such", "its", "has", "have", "been", "will", "not",
+    "organization", "organisation", "ensure", "including", "where", "which", "their",
+    "into", "upon", "each", "other", "may", "can", "also", "use", "used",
+}
+
+
+# --- Tokenization ---
+
+def _stem(token: str) -> str:
+    for suffix in ("ations", "ation", "ing", "ies", "ed", "es", "s"):
+        if token.endswith(suffix) and len(token) - len(suffix) >= 4:
+            return token[: -len(suffix)] + ("y" if suffix == "ies" else "")
+    return token
+
+
+def tokenize(text: str) -> list:
+    """Lower-case word tokens, stopwords removed and lightly stemmed."""
+    return [
+        _stem(token)
+        for token in _TOKEN_RE.findall((text or "").lower())
+        if len(token) > 2 and token not in STOPWORDS
+    ]
+
+
+def control_text(control: dict) -> str:
+    return " ".join(str(control.get(key) or "") for key in ("title", "description"))
+
+
+def passage_spans(text, words: int = PASSAGE_WORDS, stride: int = PASSAGE_STRIDE):
+    """
+    Yield (start_word, start_char, end_char) of windows that overlap by
+    `words - stride`. Streams `TextView`s; only one window of spans is kept.
+    """
+    spans = []          # (start_char, end_char) of words from word index `first` on
+    first = 0           # word index of spans[0]
+    next_start = 0      # word index of the next window
+    count = 0
+    for _, start, end in iter_matches(text, _WORD_RE):
+        spans.append((start, end))
+        count += 1
+        if count == next_start + words:
+            yield next_start, spans[next_start - first][0], spans[-1][1]
+            next_start += stride
+            del spans[:next_start - first]
+            first = next_start
+
+    # Trailing windows shorter than `words`
+    while count and next_start < max(count - words + stride, 1) and next_start < count:
+        yield next_start, spans[next_start - first][0], spans[-1][1]
+        next_start += stride
+
+
+def split_passages(text, words: int = PASSAGE_WORDS, stride: int = PASSAGE_STRIDE):
+    """Yield (start_word, passage) windows that overlap by `words - stride`."""
+    for start, start_char, end_char in passage_spans(text, words, stride):
+        yield start, " ".join(text[start_char:end_char].split())
+
+
+# --- TF-IDF index ---
+
+class TfidfIndex:
+    """
+    Small in-memory TF-IDF index over evidence passages.
+
+    Passages are kept as character spans into the documents, and weights as
+    per-term postings in flat arrays, so the index stays compact even for
+    large documents.
+    """
+
+    def __init__(self):
+        self.passages = []      # (doc_id, start_word, start_char, end_char)
+        self._postings = {}     # term -> (passage numbers, normalized weights)
+        self._idf = {}
+        self._documents = {}
+
+    @classmethod
+    def from_documents(cls, documents: dict) -> "TfidfIndex":
+        index = cls()
+        index._documents = documents
+        term_ids = {}
+        df = array("i")
+        passage_terms = []      # per passage: (term ids, term frequencies)
+        for doc_id, text in documents.items():
+            for start, start_char, end_char in passage_spans(text):
+                index.passages.append((doc_id, start, start_char, end_char))
+                ids, tfs = array("i"), array("i")
+                for term, tf in Counter(tokenize(text[start_char:end_char])).items():
+                    term_id = term_ids.setdefault(term, len(term_ids))
+                    if term_id == len(df):
+                        df.append(0)
+                    df[term_id] += 1
+                    ids.append(term_id)
+                    tfs.append(tf)
+                passage_terms.append((ids, tfs))
+
+        n = len(passage_terms)
+        idf = [math.log((1 + n) / (1 + freq)) + 1 for freq in df]
+        index._idf = {term: idf[term_id] for term, term_id in term_ids.items()}
+
+        numbers = [array("i") for _ in idf]
+        weights = [array("d") for _ in idf]
+        for number, (ids, tfs) in enumerate(passage_terms):
+            vector = [(1 + math.log(tf)) * idf[term_id] for term_id, tf in zip(ids, tfs)]
+            norm = math.sqrt(sum(w * w for w in vector)) or 1.0
+            for term_id, w in zip(ids, vector):
+                numbers[term_id].append(number)
+                weights[term_id].append(w / norm)
+            passage_terms[number] = None
+        index._postings = {term: (numbers[term_id], weights[term_id]) for term, term_id in term_ids.items()}
+        return index
+
+    def _weigh(self, counts: Counter) -> dict:
+        vector = {
+            term: (1 + math.log(tf)) * self._idf[term]
+            for term, tf in counts.items()
+            if term in self._idf
+        }
+        norm = math.sqrt(sum(w * w for w in vector.values())) or 1.0
+        return {term: w / norm for term, w in vector.items()}
+
+    def query_spans(self, text: str, top_k: int = 3) -> list:
+        """Return up to `top_k` (score, passage number) pairs, best first."""
+        query = self._weigh(Counter(tokenize(text)))
+        scores = {}
+        for term, weight in query.items():
+            numbers, weights = self._postings.get(term, ((), ()))
+            for number, w in zip(numbers, weights):
+                scores[number] = scores.get(number, 0.0) + weight * w
+        scored = ((score, number) for number, score in scores.items() if score > 0)
+        return heapq.nsmallest(top_k, scored, key=lambda item: (-item[0], item[1]))
+
+    def query(self, text: str, top_k: int = 3) -> list:
+        """Return up to `top_k` (score, doc_id, start_word, passage) tuples, best first."""
+        results = []
+        for score, number in self.query_spans(text, top_k):
+            doc_id, start, start_char, end_char = self.passages[number]
+            results.append((score, doc_id, start, self._documents[doc_id][start_char:end_char]))
+        return results
+
+
+# --- Pre-screening ---
+
+@dataclass
+class PrescreenResult:
+    not_covered: list = field(default_factory=list)   # ready-made evaluations
+    candidates: list = field(default_factory=list)    # controls that still need the mapper
+    scores: dict = field(default_factory=dict)        # control_id -> best similarity
+
+
+def not_covered_evaluation(control: dict, score: float) -> dict:
+    evaluation = {
+        "control_id": control.get("id"),
+        "coverage": "not_covered",
+        "evidence": [],
+        "missing_elements": [control.get("title") or control.get("description") or "No evidence found"],
+        "notes": (
+            f"No related text found in the evidence documents "
+            f"(local pre-screen similarity {score:.2f})."
+        ),
+        "prescreened": True,
+    }
+    if control.get("domain"):
+        evaluation["domain"] = control["domain"]
+    return evaluation
+
+
+def prescreen_controls(controls: list, documents: dict, threshold: float = None, index=None) -> PrescreenResult:
+    """
+    Split controls into obviously uncovered ones and candidates for the LLM mapper.
+
+    A control whose best TF-IDF cosine similarity against every evidence passage
+    is below `threshold` is marked `not_covered` locally.
+    """
+    threshold = DEFAULT_THRESHOLD if threshold is None else threshold
+    index = index or TfidfIndex.from_documents(documents or {})
+    result = PrescreenResult()
+
+    for control in controls:
+        matches = index.query(control_text(control), top_k=1)
+        score = matches[0][0] if matches else 0.0
+        result.scores[control.get("id")] = score
+        if score < threshold:
+            result.not_covered.append(not_covered_evaluation(control, score))
+        else:
+            result.candidates.append(control)
+
+    return result
+
+
+# --- Mapper context ---
+
+def evidence_excerpts(controls: list, documents: dict, index: TfidfIndex = None, budget: int = None) -> dict:
+    """
+    Documents as the mapper sees them for `controls`.
+
+    When all documents fit in `budget` characters they are passed whole.
+    Otherwise each document is cut down to the passages that best match the
+    controls, in document order, so quoted snippets still come verbatim from
+    the source and can be verified against the full text.
+    """
+    budget = MAPPER_CONTEXT_CHARS if budget is None else budget
+    if sum(len(text) for text in documents.values()) <= budget:
+        return {doc_id: str(text) for doc_id, text in documents.items()}
+
+    index = index or TfidfIndex.from_documents(documents)
+    ranked = []
+    for control in controls:
+        ranked.extend(index.query_spans(control_text(control), top_k=EXCERPT_PASSAGES_PER_CONTROL))
+    ranked.sort(key=lambda item: item[0], reverse=True)
+
+    chosen, used, seen = {}, 0, set()
+    for _, number in ranked:
+        if number in seen:
+            continue
+        seen.add(number)
+        doc_id, _, start_char, end_char = index.passages[number]
+        if used + (end_char - start_char) > budget:
+            break
+        chosen.setdefault(doc_id, []).append((start_char, end_char))
+        used += end_char - start_char
+
+    excerpts = {}
+    for doc_id, spans in chosen.items():
+        merged = []
+        for start, end in sorted(spans):
+            if merged and start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        text = documents[doc_id]
+        excerpts[doc_id] = "\n[…]\n".join(text[start:end] for start, end in merged)
+    return excerpts
@@ -0,0 +1,191 @@
+# pipeline/snippet_index.py
+
+import os
+import re
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from difflib import SequenceMatcher
+
+from pipeline.text_store import iter_matches
+
+# Minimum fuzzy similarity for a snippet to count as verified
+MATCH_THRESHOLD = float(os.getenv("AUDITSENSE_SNIPPET_MATCH_THRESHOLD", "0.85"))
+# "drop" removes unverified evidence, "flag" keeps it with verified=False
+UNVERIFIED_POLICY = os.getenv("AUDITSENSE_UNVERIFIED_SNIPPETS", "drop")
+
+SHINGLE_SIZE = 3
+# Shingles are sorted in 2**SHINGLE_BUCKET_BITS buckets by their top hash bits
+SHINGLE_BUCKET_BITS = 8
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _shingle_hash(word_ids) -> int:
+    return hash(tuple(word_ids)) & 0x7FFFFFFF
+
+
+def _sorted_packed(values) -> array:
+    """
+    Sort non-negative 63-bit ints into an array("q").
+
+    Values are first spread over flat array buckets by their top bits, then
+    each bucket is sorted and appended in turn, so only one bucket at a time
+    exists as a list of Python ints (instead of the whole input).
+    """
+    shift = 63 - SHINGLE_BUCKET_BITS
+    buckets = [array("q") for _ in range(1 << SHINGLE_BUCKET_BITS)]
+    for value in values:
+        buckets[value >> shift].append(value)
+    result = array("q")
+    for i, bucket in enumerate(buckets):
+        result.extend(sorted(bucket))
+        buckets[i] = None
+    return result
+
+
+class SnippetIndex:
+    """
+    Word n-gram index over one document for locating LLM-quoted snippets.
+
+    Words are normalized (lower-cased, punctuation and whitespace ignored) and
+    mapped back to character offsets in the original text, so verification is
+    insensitive to re-wrapping while offsets still point into the source.
+
+    `text` may be a `str` or a `TextView`; the index itself is a handful of
+    flat arrays (word ids, offsets, sorted shingle hashes), not per-word objects.
+    """
+
+    def __init__(self, text, shingle_size: int = SHINGLE_SIZE):
+        self.text = text if text is not None else ""
+        self.shingle_size = shingle_size
+        self._vocab = {}
+        self.word_ids = array("i")      # normalized words as vocabulary ids
+        self.starts = array("I")        # char offset where each word starts
+        self.ends = array("I")          # ... and ends
+        for word, start, end in iter_matches(self.text, _WORD_RE):
+            self.word_ids.append(self._vocab.setdefault(word.lower(), len(self._vocab)))
+            self.starts.append(start)
+            self.ends.append(end)
+
+        # One sorted array of (31-bit shingle hash << 32 | word position) for bisect lookup
+        self._shingles = _sorted_packed(
+            _shingle_hash(self.word_ids[i:i + shingle_size]) << 32 | i
+            for i in range(len(self.word_ids) - shingle_size + 1)
+        )
+
+    def _span(self, first_word: int, last_word: int) -> tuple:
+        return self.starts[first_word], self.ends[last_word]
+
+    def _positions(self, shingle):
+        key = _shingle_hash(shingle)
+        i = bisect_left(self._shingles, key << 32)
+        while i < len(self._shingles) and self._shingles[i] >> 32 == key:
+            yield self._shingles[i] & 0xFFFFFFFF
+            i += 1
+
+    def find(self, snippet: str, threshold: float = None):
+        """
+        Locate `snippet` in the document.
+
+        Returns {'start', 'end', 'match_score'} or None if nothing scores at
+        least `threshold`. Exact word-sequence matches score 1.0.
+        """
+        threshold = MATCH_THRESHOLD if threshold is None else threshold
+        query = array("i", (self._vocab.get(w.lower(), -1) for w in _WORD_RE.findall(snippet or "")))
+        n = len(query)
+        if not n or not self.word_ids:
+            return None
+
+        # Candidate start positions: vote by shared shingles, aligned to the query start
+        votes = Counter()
+        k = min(self.shingle_size, n)
+        if k == self.shingle_size:
+            for offset in range(n - k + 1):
+                for position in self._positions(query[offset:offset + k]):
+                    votes[position - offset] += 1
+        else:
+            # Snippets shorter than a shingle: scan for the first word
+            for position, word in enumerate(self.word_ids):
+                if word == query[0]:
+                    votes[position] += 1
+
+        best = None
+        for start, _ in votes.most_common(20):
+            start = max(0, start)
+            window = self.word_ids[start:start + n]
+            if window == query:
+                return {**dict(zip(("start", "end"), self._span(start, start + n - 1))), "match_score": 1.0}
+            score = SequenceMatcher(None, query.tolist(), window.tolist(), autojunk=False).ratio()
+            if best is None or score > best[0]:
+                best = (score, start, len(window))
+
+        if best is None or best[0] < threshold or not best[2]:
+            return None
+        score, start, length = best
+        first, last = self._span(start, start + length - 1)
+        return {"start": first, "end": last, "match_score": round(score, 3)}
+
+
+def verify_evaluations(evaluations: list, documents: dict, threshold: float = None,
+                       policy: str = None, indexes: dict = None) -> list:
+    """
+    Attach character offsets to every evidence snippet and drop or flag the
+    ones that cannot be found in the cited document.
+
+    Evaluations are updated in place and also returned. Bare-string evidence
+    is treated as a snippet (of the only document, if there is one); other
+    non-dict items count as unverified. Each evaluation gets an
+    `unverified_evidence` count; a 'covered' verdict left with no verified
+    evidence is downgraded to 'partially_covered'.
+    """
+    policy = policy or UNVERIFIED_POLICY
+    indexes = {} if indexes is None else indexes
+
+    for evaluation in evaluations:
+        kept, unverified = [], 0
+        items = evaluation.get("evidence") or []
+        if isinstance(items, (str, dict)):
+            items = [items]
+        for evidence in items:
+            # Mappers sometimes quote evidence as bare strings
+            if isinstance(evidence, str):
+                evidence = {"snippet": evidence}
+            elif not isinstance(evidence, dict):
+                unverified += 1
+                continue
+
+            doc_id = evidence.get("doc_id")
+            if doc_id is None and len(documents) == 1:
+                doc_id = evidence["doc_id"] = next(iter(documents))
+            if doc_id not in indexes and doc_id in documents:
+                indexes[doc_id] = SnippetIndex(documents[doc_id])
+            index = indexes.get(doc_id)
+
+            match = index.find(evidence.get("snippet", ""), threshold) if index else None
+            if match:
+                evidence.update(match, verified=True)
+                kept.append(evidence)
+                continue
+
+            unverified += 1
+            if policy == "flag":
+                evidence["verified"] = False
+                kept.append(evidence)
+
+        had_evidence = bool(evaluation.get("evidence"))
+        evaluation["evidence"] = kept
+        evaluation["unverified_evidence"] = unverified
+
+        if (
+            evaluation.get("coverage") == "covered"
+            and had_evidence
+            and not any(e.get("verified") for e in kept)
+        ):
+            evaluation["coverage"] = "partially_covered"
+            evaluation["notes"] = (
+                (evaluation.get("notes") or "")
+                + " [Downgraded: cited evidence could not be found in the documents.]"
+            ).strip()
+
+    return evaluations
@@ -0,0 +1,310 @@
+# pipeline/text_store.py
+
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+import time
+import weakref
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+
+DEFAULT_STORE_DIR = os.getenv("AUDITSENSE_TEXT_STORE_DIR", os.path.join("state", "texts"))
+
+# A byte offset is recorded every CHECKPOINT_CHARS characters so character
+# slices only decode the blocks they touch
+CHECKPOINT_CHARS = 64 * 1024
+CHUNK_CHARS = 1024 * 1024
+
+# Recently used views kept open for reuse; older ones close once no job holds them
+CACHED_VIEWS = int(os.getenv("AUDITSENSE_TEXT_STORE_CACHED_VIEWS", "8"))
+# Stored texts not used for this long are deleted by sweep()
+RETENTION_SECONDS = float(os.getenv("AUDITSENSE_TEXT_STORE_RETENTION_DAYS", "7")) * 86400
+
+# Documented per-job budget (README): peak Python heap of the local stages
+# (extraction, store, pre-screen, verification) per MB of evidence text, plus a
+# fixed base. Text is streamed to disk, so this covers only the TF-IDF postings
+# and the snippet index arrays (about 5 MB per MB of text).
+PEAK_MEMORY_PER_TEXT_MB = 6
+PEAK_MEMORY_BASE_MB = 8
+
+
+@dataclass(frozen=True)
+class TextRef:
+    """Reference to a stored text: SHA-256 of its UTF-8 bytes and its length in characters."""
+
+    digest: str
+    chars: int
+
+    def __str__(self) -> str:
+        return f"text:{self.digest}"
+
+
+class TextView:
+    """
+    Read-only, memory-mapped view of one stored text.
+
+    Behaves like a `str` for `len()` and character slicing, and yields
+    `chunks()` for streaming, without ever holding the whole text in memory.
+    """
+
+    def __init__(self, path: str, ref: TextRef, checkpoints: array):
+        self.ref = ref
+        self._checkpoints = checkpoints
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self._size = size
+        # Unmap and close the file once the last reference to the view is gone
+        self._finalizer = weakref.finalize(self, _release, self._data, self._file)
+
+    @property
+    def digest(self) -> str:
+        return self.ref.digest
+
+    def __len__(self) -> int:
+        return self.ref.chars
+
+    def __repr__(self) -> str:
+        return f"TextView({self.ref.digest[:12]}…, {self.ref.chars} chars)"
+
+    def _block(self, index: int) -> str:
+        start = self._checkpoints[index]
+        end = self._checkpoints[index + 1] if index + 1 < len(self._checkpoints) else self._size
+        return self._data[start:end].decode("utf-8")
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            if key < 0:
+                key += len(self)
+            if not 0 <= key < len(self):
+                raise IndexError("text index out of range")
+            return self[key:key + 1]
+        start, stop, step = key.indices(len(self))
+        if step != 1:
+            raise ValueError("TextView slices do not support a step")
+        if start >= stop:
+            return ""
+        first, last = start // CHECKPOINT_CHARS, (stop - 1) // CHECKPOINT_CHARS
+        text = "".join(self._block(i) for i in range(first, last + 1))
+        offset = first * CHECKPOINT_CHARS
+        return text[start - offset:stop - offset]
+
+    def chunks(self, size: int = CHUNK_CHARS):
+        """Yield (start_char, text) pieces of about `size` characters."""
+        blocks = max(1, size // CHECKPOINT_CHARS)
+        for first in range(0, len(self._checkpoints), blocks):
+            last = min(first + blocks, len(self._checkpoints))
+            yield first * CHECKPOINT_CHARS, "".join(self._block(i) for i in range(first, last))
+
+    def read(self) -> str:
+        """The whole text. Only for small documents; prefer slices and chunks()."""
+        return self[0:len(self)]
+
+    __str__ = read
+
+    def close(self) -> None:
+        self._finalizer()
+
+
+def _release(data, file) -> None:
+    if isinstance(data, mmap.mmap):
+        data.close()
+    file.close()
+
+
+class TextStore:
+    """
+    Content-addressed, on-disk store of normalized document text.
+
+    Each text is written once as `<digest>.txt` (UTF-8) with a `<digest>.idx`
+    checkpoint file, then shared read-only through memory-mapped `TextView`s,
+    so a document exists once however many stages, jobs or processes use it.
+    `source` keys (e.g. the raw download's hash) map back to stored texts so
+    repeated downloads skip extraction entirely.
+
+    The last `cached_views` views stay open for reuse; others are closed when
+    no caller references them any more. `sweep()` deletes unused texts.
+    """
+
+    def __init__(self, directory: str = None, cached_views: int = None):
+        self.directory = directory or DEFAULT_STORE_DIR
+        self.cached_views = CACHED_VIEWS if cached_views is None else cached_views
+        self._recent = OrderedDict()                  # digest -> view, LRU
+        self._views = weakref.WeakValueDictionary()   # every view still referenced
+        self._lock = threading.Lock()
+
+    def _path(self, name: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{os.path.basename(name)}{suffix}")
+
+    def put(self, text, source: str = None) -> TextRef:
+        """Store a `str` (or an iterable of `str` pieces). Returns its reference."""
+        os.makedirs(self.directory, exist_ok=True)
+        pieces = [text] if isinstance(text, str) else text
+        digest = hashlib.sha256()
+        checkpoints = array("q")
+        chars = written = 0
+        pending, size = [], 0
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for piece in pieces:
+                    # Small pieces are collected until a whole block is available
+                    pending.append(piece)
+                    size += len(piece)
+                    if size < CHECKPOINT_CHARS:
+                        continue
+                    # Walk an offset through the buffer; only the short tail is copied
+                    buffer = "".join(pending)
+                    offset = 0
+                    while len(buffer) - offset >= CHECKPOINT_CHARS:
+                        block = buffer[offset:offset + CHECKPOINT_CHARS]
+                        written += self._write_block(f, block, digest, checkpoints, written)
+                        chars += len(block)
+                        offset += CHECKPOINT_CHARS
+                    pending, size = [buffer[offset:]], len(buffer) - offset
+                    del buffer
+                tail = "".join(pending)
+                if tail or not checkpoints:
+                    written += self._write_block(f, tail, digest, checkpoints, written)
+                    chars += len(tail)
+
+            ref = TextRef(digest.hexdigest(), chars)
+            if os.path.exists(self._path(ref.digest, ".txt")):
+                os.remove(tmp_path)  # already stored
+            else:
+                with open(self._path(ref.digest, ".idx"), "wb") as f:
+                    checkpoints.tofile(f)
+                os.replace(tmp_path, self._path(ref.digest, ".txt"))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        if source:
+            self._write_alias(source, ref)
+        return ref
+
+    @staticmethod
+    def _write_block(f, block: str, digest, checkpoints: array, offset: int) -> int:
+        data = block.encode("utf-8")
+        checkpoints.append(offset)
+        digest.update(data)
+        f.write(data)
+        return len(data)
+
+    def _write_alias(self, source: str, ref: TextRef) -> None:
+        tmp_path = self._path(source, ".ref.tmp")
+        with open(tmp_path, "w") as f:
+            f.write(f"{ref.digest} {ref.chars}")
+        os.replace(tmp_path, self._path(source, ".ref"))
+
+    def find_source(self, source: str):
+        """The reference stored for `source`, or None."""
+        try:
+            with open(self._path(source, ".ref")) as f:
+                digest, chars = f.read().split()
+        except (FileNotFoundError, ValueError):
+            return None
+        if not os.path.exists(self._path(digest, ".txt")):
+            return None
+        self._touch(source, ".ref")
+        return TextRef(digest, int(chars))
+
+    def _touch(self, name: str, suffix: str) -> None:
+        try:
+            os.utime(self._path(name, suffix))
+        except FileNotFoundError:
+            pass
+
+    def open(self, ref: TextRef) -> TextView:
+        with self._lock:
+            view = self._views.get(ref.digest)
+            if view is None:
+                checkpoints = array("q")
+                with open(self._path(ref.digest, ".idx"), "rb") as f:
+                    checkpoints.frombytes(f.read())
+                view = TextView(self._path(ref.digest, ".txt"), ref, checkpoints)
+                self._views[ref.digest] = view
+                self._touch(ref.digest, ".txt")  # marks it used for sweep()
+            self._recent[ref.digest] = view
+            self._recent.move_to_end(ref.digest)
+            while len(self._recent) > self.cached_views:
+                self._recent.popitem(last=False)
+            return view
+
+    def sweep(self, max_age: float = None, now: float = None) -> int:
+        """
+        Delete stored texts (and source aliases) unused for `max_age` seconds,
+        skipping texts with open views. Returns the number of texts deleted.
+        """
+        max_age = RETENTION_SECONDS if max_age is None else max_age
+        cutoff = (time.time() if now is None else now) - max_age
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return 0
+
+        with self._lock:
+            in_use = set(self._views.keys())
+        deleted = 0
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) >= cutoff:
+                    continue
+                if name.endswith(".txt") and name[:-4] not in in_use:
+                    os.remove(path)
+                    if os.path.exists(path[:-4] + ".idx"):
+                        os.remove(path[:-4] + ".idx")
+                    deleted += 1
+                elif name.endswith((".ref", ".tmp")):
+                    os.remove(path)  # stale alias or leftover of an interrupted put()
+            except FileNotFoundError:
+                continue  # removed concurrently
+        return deleted
+
+    def close(self) -> None:
+        with self._lock:
+            for view in list(self._views.values()):
+                view.close()
+            self._views.clear()
+            self._recent.clear()
+
+
+text_store = TextStore()
+
+
+def iter_matches(text, pattern, chunk_chars: int = CHUNK_CHARS):
+    """
+    Yield (match, start, end) for every `pattern` match in a `str` or a
+    `TextView`, streaming views chunk by chunk (matches may span chunks).
+    """
+    if not hasattr(text, "chunks"):
+        for match in pattern.finditer(text or ""):
+            yield match.group(), match.start(), match.end()
+        return
+
+    carry, carry_start = "", 0
+    for start, chunk in text.chunks(chunk_chars):
+        buffer, base = carry + chunk, carry_start if carry else start
+        carry = ""
+        for match in pattern.finditer(buffer):
+            if match.end() == len(buffer):
+                # May continue in the next chunk; rescan it from there
+                carry, carry_start = buffer[match.start():], base + match.start()
+                break
+            yield match.group(), base + match.start(), base + match.end()
+    for match in pattern.finditer(carry):
+        yield match.group(), carry_start + match.start(), carry_start + match.end()
+
+
+def text_digest(text) -> bytes:
+    """SHA-256 of a text's UTF-8 bytes; free for stored views."""
+    digest = getattr(text, "digest", None)
+    if digest:
+        return bytes.fromhex(digest)
+    return hashlib.sha256(str(text).encode("utf-8")).digest()
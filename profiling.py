@@ -0,0 +1,288 @@
+# profiling.py
+
+import contextvars
+import functools
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from result_store import DEFAULT_RESULTS_DIR
+
+# Percentage (0-100) of worker jobs profiled even when not requested
+PROFILE_SAMPLE_PERCENT = float(os.getenv("AUDITSENSE_PROFILE_SAMPLE_PERCENT", "0"))
+SAMPLE_INTERVAL = float(os.getenv("AUDITSENSE_PROFILE_INTERVAL_MS", "5")) / 1000.0
+
+# First matching frame from the leaf upwards decides where a sample's time went
+CATEGORIES = (
+    ("llm_wait", ("/litellm/", "/openai/", "/httpx/", "/httpcore/")),
+    ("fetch", ("fetch_document_tool.py", "text_extraction.py", "/requests/", "/urllib3/")),
+    ("crewai", ("/crewai/",)),
+    ("pipeline", ("/pipeline/", "/standards/", "crew_definition.py")),
+)
+# Samples whose leaf sits here are idle threads (waiting on a lock/queue), not work
+_IDLE_FILES = ("threading.py", "queue.py", "selectors.py")
+
+_active = contextvars.ContextVar("auditsense_profiler", default=None)
+
+
+def should_profile(requested=None, sample_percent: float = None) -> bool:
+    """Profile when explicitly requested, otherwise for `sample_percent`% of jobs."""
+    if str(requested).strip().lower() in ("1", "true", "yes", "on"):
+        return True
+    percent = PROFILE_SAMPLE_PERCENT if sample_percent is None else sample_percent
+    return percent > 0 and random.random() * 100 < percent
+
+
+def _frame_name(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def categorize(filenames) -> str:
+    """Category of a sample given its frames' filenames, leaf first."""
+    for filename in filenames:
+        path = filename.replace(os.sep, "/")
+        for category, markers in CATEGORIES:
+            if any(marker in path for marker in markers):
+                return category
+    return "other"
+
+
+class StageTimer:
+    """Wall and CPU time of one stage; `track()` also counts CPU of helper threads."""
+
+    def __init__(self, profiler=None):
+        self.profiler = profiler
+        self.cpu = 0.0
+        self._lock = threading.Lock()
+
+    def track(self, fn):
+        """Wrap `fn` so the thread running it is sampled and its CPU time counted."""
+        if self.profiler is None:
+            return fn
+
+        @functools.wraps(fn)
+        def tracked(*args, **kwargs):
+            cpu = time.thread_time()
+            with self.profiler.thread():
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    with self._lock:
+                        self.cpu += time.thread_time() - cpu
+        return tracked
+
+
+class JobProfiler:
+    """
+    Sampling profiler for one pipeline run.
+
+    A background thread samples the stacks of the threads working on the job
+    (the one entering the profiler plus any wrapped with `StageTimer.track`).
+    Stages timed with `profile_stage()` record wall vs CPU time; the gap is
+    time spent waiting, mostly on LLM calls. `export()` writes a folded-stack
+    flamegraph file, a speedscope profile and a JSON summary.
+    """
+
+    def __init__(self, job_id: str, directory: str = None, interval: float = None):
+        self.job_id = job_id
+        self.directory = directory or DEFAULT_RESULTS_DIR
+        self.interval = interval or SAMPLE_INTERVAL
+        self.stages = {}
+        self.samples = Counter()          # (thread name, frame, ..., leaf frame) -> count
+        self.categories = Counter()
+        self.paths = []
+        self._threads = {}                # thread ident -> nesting depth
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+        self._token = None
+        self._started = None
+        self.duration = 0.0
+
+    # --- Lifecycle ---
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        self._token = _active.set(self)
+        self._register(threading.get_ident(), 1)
+        self._sampler = threading.Thread(target=self._run, name="auditsense-profiler", daemon=True)
+        self._sampler.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._sampler.join()
+        self._register(threading.get_ident(), -1)
+        _active.reset(self._token)
+        self.duration = time.perf_counter() - self._started
+        self.export()
+        return False
+
+    @contextmanager
+    def thread(self):
+        ident = threading.get_ident()
+        self._register(ident, 1)
+        try:
+            yield
+        finally:
+            self._register(ident, -1)
+
+    def _register(self, ident: int, delta: int):
+        with self._lock:
+            depth = self._threads.get(ident, 0) + delta
+            if depth > 0:
+                self._threads[ident] = depth
+            else:
+                self._threads.pop(ident, None)
+
+    # --- Sampling ---
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        with self._lock:
+            wanted = set(self._threads)
+        names = {t.ident: t.name for t in threading.enumerate()}
+
+        for ident, frame in sys._current_frames().items():
+            if ident not in wanted:
+                continue
+            codes = []
+            while frame is not None:
+                codes.append(frame.f_code)
+                frame = frame.f_back
+            if not codes or os.path.basename(codes[0].co_filename) in _IDLE_FILES:
+                continue
+            self.categories[categorize(code.co_filename for code in codes)] += 1
+            stack = (names.get(ident, str(ident)),) + tuple(_frame_name(c) for c in reversed(codes))
+            self.samples[stack] += 1
+
+    # --- Stage timing ---
+
+    @contextmanager
+    def stage(self, name: str):
+        timer = StageTimer(self)
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield timer
+        finally:
+            elapsed = time.perf_counter() - wall
+            cpu_seconds = time.thread_time() - cpu + timer.cpu
+            with self._lock:
+                stats = self.stages.setdefault(name, {"calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0})
+                stats["calls"] += 1
+                stats["wall_seconds"] += elapsed
+                stats["cpu_seconds"] += cpu_seconds
+
+    # --- Export ---
+
+    def summary(self) -> dict:
+        stages = {
+            name: {
+                "calls": s["calls"],
+                "wall_seconds": round(s["wall_seconds"], 3),
+                "cpu_seconds": round(s["cpu_seconds"], 3),
+                # Wall time not spent on this process's CPU: LLM calls, network, I/O
+                "wait_seconds": round(max(s["wall_seconds"] - s["cpu_seconds"], 0.0), 3),
+            }
+            for name, s in self.stages.items()
+        }
+        return {
+            "job_id": self.job_id,
+            "duration_seconds": round(self.duration, 3),
+            "interval_seconds": self.interval,
+            "samples": sum(self.samples.values()),
+            "stages": stages,
+            "sampled_seconds": {k: round(v * self.interval, 3) for k, v in self.categories.items()},
+        }
+
+    def folded(self) -> str:
+        """Brendan Gregg's folded-stack format, readable by flamegraph.pl and speedscope."""
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in sorted(self.samples.items()))
+
+    def speedscope(self) -> dict:
+        frames, frame_index = [], {}
+        by_thread = {}
+        for stack, count in self.samples.items():
+            thread, calls = stack[0], stack[1:]
+            indices = []
+            for name in calls:
+                if name not in frame_index:
+                    frame_index[name] = len(frames)
+                    frames.append({"name": name})
+                indices.append(frame_index[name])
+            samples, weights = by_thread.setdefault(thread, ([], []))
+            samples.append(indices)
+            weights.append(count * self.interval)
+
+        profiles = [
+            {
+                "type": "sampled",
+                "name": thread,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": round(sum(weights), 6),
+                "samples": samples,
+                "weights": weights,
+            }
+            for thread, (samples, weights) in sorted(by_thread.items())
+        ]
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": f"AuditSense job {self.job_id}",
+            "exporter": "auditsense",
+            "shared": {"frames": frames},
+            "profiles": profiles,
+        }
+
+    def export(self) -> list:
+        """Write `<job_id>.folded`, `<job_id>.speedscope.json` and `<job_id>.profile.json`."""
+        os.makedirs(self.directory, exist_ok=True)
+        safe_id = os.path.basename(str(self.job_id))
+        outputs = {
+            ".folded": self.folded(),
+            ".speedscope.json": json.dumps(self.speedscope()),
+            ".profile.json": json.dumps(self.summary(), indent=2),
+        }
+        self.paths = []
+        for suffix, content in outputs.items():
+            path = os.path.join(self.directory, safe_id + suffix)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(content)
+            self.paths.append(path)
+        return self.paths
+
+
+def current_profiler():
+    return _active.get()
+
+
+def profiled_thread(fn):
+    """Wrap `fn` so the pool thread running it is sampled by the active profiler."""
+    profiler = _active.get()
+    if profiler is None:
+        return fn
+
+    @functools.wraps(fn)
+    def wrapped(*args, **kwargs):
+        with profiler.thread():
+            return fn(*args, **kwargs)
+    return wrapped
+
+
+@contextmanager
+def profile_stage(name: str):
+    """Time a stage on the active profiler; a no-op timer when not profiling."""
+    profiler = _active.get()
+    if profiler is None:
+        yield StageTimer()
+        return
+    with profiler.stage(name) as timer:
+        yield timer
@@ -0,0 +1,153 @@
+# result_store.py
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+try:
+    import zstandard
+except ImportError:  # optional: gzip is used when zstandard is not installed
+    zstandard = None
+
+DEFAULT_RESULTS_DIR = os.getenv("AUDITSENSE_RESULTS_DIR", os.path.join("state", "results"))
+
+# List sections of a report that can be paginated
+PAGINATED_SECTIONS = ("evaluations", "domain_scores")
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class ResultNotFound(KeyError):
+    """Raised when no stored report exists for a job."""
+
+
+def compact_json(data) -> str:
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+class ResultStore:
+    """
+    Completed reports stored once on disk as compressed compact JSON.
+
+    Files are `<job_id>.json.zst` (zstandard installed) or `<job_id>.json.gz`,
+    plus a `<job_id>.etag` sidecar holding the SHA-256 of the JSON. A small
+    LRU keeps recently read reports decoded for repeated polling.
+    """
+
+    def __init__(self, directory: str = None, cache_size: int = 8):
+        self.directory = directory or DEFAULT_RESULTS_DIR
+        os.makedirs(self.directory, exist_ok=True)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, job_id: str, suffix: str) -> str:
+        # job ids are UUIDs; never let one escape the results directory
+        safe_id = os.path.basename(job_id)
+        return os.path.join(self.directory, f"{safe_id}{suffix}")
+
+    def save(self, job_id: str, report) -> str:
+        """Compress and store a report. Returns its ETag."""
+        raw = compact_json(report).encode("utf-8")
+        etag = hashlib.sha256(raw).hexdigest()[:32]
+
+        if zstandard is not None:
+            path, data = self._path(job_id, ".json.zst"), zstandard.ZstdCompressor(level=10).compress(raw)
+        else:
+            path, data = self._path(job_id, ".json.gz"), gzip.compress(raw, compresslevel=6)
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with open(self._path(job_id, ".etag"), "w") as f:
+            f.write(etag)
+
+        with self._lock:
+            self._cache.pop(job_id, None)
+        return etag
+
+    def etag(self, job_id: str) -> str:
+        try:
+            with open(self._path(job_id, ".etag")) as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            raise ResultNotFound(job_id)
+
+    def load_raw(self, job_id: str) -> str:
+        """The stored report as a compact JSON string."""
+        zst_path, gz_path = self._path(job_id, ".json.zst"), self._path(job_id, ".json.gz")
+        if os.path.exists(zst_path):
+            if zstandard is None:
+                raise RuntimeError("Report was stored with zstandard, which is not installed")
+            with open(zst_path, "rb") as f:
+                return zstandard.ZstdDecompressor().decompress(f.read()).decode("utf-8")
+        if os.path.exists(gz_path):
+            with gzip.open(gz_path, "rb") as f:
+                return f.read().decode("utf-8")
+        raise ResultNotFound(job_id)
+
+    def load(self, job_id: str):
+        with self._lock:
+            if job_id in self._cache:
+                self._cache.move_to_end(job_id)
+                return self._cache[job_id]
+
+        report = json.loads(self.load_raw(job_id))
+        with self._lock:
+            self._cache[job_id] = report
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return report
+
+
+def select_report(report: dict, fields=None, offset: int = 0, limit: int = DEFAULT_PAGE_SIZE) -> dict:
+    """
+    Project a report onto `fields` and paginate its list sections.
+
+    Args:
+        report: Full report dict
+        fields: Top-level keys to return (None → all)
+        offset, limit: Page applied to each of PAGINATED_SECTIONS
+
+    Returns:
+        The selected view with a `pagination` entry per paginated section.
+    """
+    offset = max(0, offset)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    wanted = set(fields) if fields else None
+
+    view, pagination = {}, {}
+    for key, value in report.items():
+        if wanted is not None and key not in wanted:
+            continue
+        if key in PAGINATED_SECTIONS and isinstance(value, list):
+            view[key] = value[offset:offset + limit]
+            pagination[key] = {
+                "offset": offset,
+                "limit": limit,
+                "total": len(value),
+                "next_offset": offset + limit if offset + limit < len(value) else None,
+            }
+        else:
+            view[key] = value
+
+    if pagination:
+        view["pagination"] = pagination
+    return view
+
+
+def view_etag(etag: str, *params) -> str:
+    """ETag for a derived view of a stored report (depends on the query parameters)."""
+    suffix = hashlib.sha256(repr(params).encode("utf-8")).hexdigest()[:8]
+    return f'"{etag}-{suffix}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
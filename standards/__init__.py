@@ -0,0 +1,2 @@
+# standards/__init__.py
+# Local catalog of precompiled compliance control sets
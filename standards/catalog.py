@@ -0,0 +1,131 @@
+# standards/catalog.py
+
+import json
+import os
+import re
+import threading
+from functools import lru_cache
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+INDEX_FILE = "index.json"
+
+CONTROL_FIELDS = ["id", "title", "description", "domain", "priority"]
+
+_VERSION_PART_RE = re.compile(r"\d+|[a-z]+")
+
+_write_lock = threading.Lock()
+
+
+class UnknownStandardError(KeyError):
+    """Raised when a standard_id is not in the catalog."""
+
+
+# --- Index ---
+
+def version_key(version: str) -> tuple:
+    """Sort key comparing numeric parts as numbers: 'r5' < 'r10', '4.0.1' < '10'."""
+    parts = _VERSION_PART_RE.findall(str(version or "").lower())
+    return tuple((0, int(p), "") if p.isdigit() else (1, 0, p) for p in parts if p != "r")
+
+
+@lru_cache(maxsize=None)
+def load_index(data_dir: str = DATA_DIR) -> dict:
+    """Return {standard_id: {name, version, coverage, file, controls}}; read once per process."""
+    path = os.path.join(data_dir, INDEX_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def list_standards(data_dir: str = DATA_DIR) -> list:
+    return [
+        {"standard_id": standard_id, **{k: v for k, v in entry.items() if k != "file"}}
+        for standard_id, entry in sorted(load_index(data_dir).items())
+    ]
+
+
+def resolve_standard_id(standard_id: str, data_dir: str = DATA_DIR) -> str:
+    """
+    Resolve a catalog id. An unversioned id (e.g. 'iso27001') picks the
+    newest version in the catalog.
+    """
+    index = load_index(data_dir)
+    wanted = (standard_id or "").strip().lower()
+    if wanted in index:
+        return wanted
+
+    versions = [sid for sid in index if sid.startswith(f"{wanted}-")]
+    if not versions:
+        raise UnknownStandardError(standard_id)
+    return max(versions, key=lambda sid: version_key(index[sid]["version"]))
+
+
+# --- Control sets ---
+
+@lru_cache(maxsize=32)
+def _load_rows(standard_id: str, data_dir: str) -> tuple:
+    entry = load_index(data_dir)[standard_id]
+    with open(os.path.join(data_dir, entry["file"]), encoding="utf-8") as f:
+        payload = json.load(f)
+    fields = payload["fields"]
+    return tuple(tuple(zip(fields, row)) for row in payload["controls"])
+
+
+def get_standard(standard_id: str, data_dir: str = DATA_DIR) -> dict:
+    """Return the catalog entry plus a fresh list of control dicts."""
+    standard_id = resolve_standard_id(standard_id, data_dir)
+    entry = load_index(data_dir)[standard_id]
+    controls = [{k: v for k, v in row if v is not None} for row in _load_rows(standard_id, data_dir)]
+    return {
+        "standard_id": standard_id,
+        "name": entry["name"],
+        "version": entry["version"],
+        "coverage": entry.get("coverage", "full"),
+        "controls": controls,
+    }
+
+
+def get_controls(standard_id: str, data_dir: str = DATA_DIR) -> list:
+    return get_standard(standard_id, data_dir)["controls"]
+
+
+def save_standard(standard_id: str, name: str, version: str, controls: list,
+                  coverage: str = "full", data_dir: str = DATA_DIR) -> str:
+    """
+    Precompile a control set (e.g. an extractor run reviewed by an auditor)
+    into the catalog and register it in the index. Returns the file path.
+    """
+    standard_id = standard_id.strip().lower()
+    filename = f"{standard_id}.json"
+    rows = [[control.get(field) for field in CONTROL_FIELDS] for control in controls]
+
+    header = json.dumps(
+        {"standard_id": standard_id, "name": name, "version": version, "fields": CONTROL_FIELDS},
+        separators=(",", ":"),
+    )
+    # One control per line keeps the files compact but reviewable in diffs
+    body = ",\n".join(json.dumps(row, separators=(",", ":"), ensure_ascii=False) for row in rows)
+
+    with _write_lock:
+        os.makedirs(data_dir, exist_ok=True)
+        path = os.path.join(data_dir, filename)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(header[:-1] + ',"controls":[\n' + body + "\n]}\n")
+
+        index = dict(load_index(data_dir))
+        index[standard_id] = {
+            "name": name,
+            "version": version,
+            "coverage": coverage,
+            "file": filename,
+            "controls": len(rows),
+        }
+        with open(os.path.join(data_dir, INDEX_FILE), "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+        load_index.cache_clear()
+        _load_rows.cache_clear()
+
+    return path
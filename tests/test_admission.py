@@ -0,0 +1,74 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from admission import (
+    PAYMENT_EXPIRED,
+    AdmissionController,
+    TokenBucket,
+    count_awaiting_payment,
+    expire_unpaid_jobs,
+)
+
+
+class FakeQueue:
+    def __init__(self, depth=0, average=None):
+        self._depth = depth
+        self._average = average
+
+    def depth(self):
+        return self._depth
+
+    def average_duration(self):
+        return self._average
+
+
+def test_token_bucket_refills_over_time():
+    bucket = TokenBucket(rate=1.0, capacity=2, now=0.0)
+    assert bucket.try_take(now=0.0) == 0
+    assert bucket.try_take(now=0.0) == 0
+    assert bucket.try_take(now=0.0) == 1.0
+    assert bucket.try_take(now=1.0) == 0
+
+
+def test_rate_limit_is_per_purchaser():
+    controller = AdmissionController(FakeQueue(), workers=2, rate_per_minute=1, burst=1)
+
+    assert controller.admit("alice").allowed
+    decision = controller.admit("alice")
+    assert decision.status_code == 429
+    assert int(decision.headers()["Retry-After"]) > 0
+
+    assert controller.admit("bob").allowed
+
+
+def test_full_queue_and_missed_deadline_return_503():
+    full = AdmissionController(FakeQueue(depth=10), workers=2, max_queue_depth=10)
+    assert full.admit("alice").status_code == 503
+
+    # 7 jobs ahead on 2 workers at 600 s each → 4 rounds = 2400 s > 1800 s deadline
+    slow = AdmissionController(
+        FakeQueue(depth=5, average=600.0), workers=2, max_queue_depth=100, deadline_seconds=1800
+    )
+    decision = slow.admit("alice", pending_jobs=2)
+    assert decision.status_code == 503
+    assert decision.estimated_completion == 2400
+    assert decision.retry_after == 300
+
+    # Rejected requests do not burn the purchaser's rate-limit tokens
+    slow.deadline_seconds = 10_000
+    assert slow.admit("alice", pending_jobs=2).allowed
+
+
+def test_unpaid_jobs_past_pay_by_time_stop_blocking_admission():
+    controller = AdmissionController(FakeQueue(depth=0), workers=2, max_queue_depth=2)
+    jobs = {
+        "abandoned-1": {"status": "awaiting_payment", "pay_by": 100.0},
+        "abandoned-2": {"status": "awaiting_payment", "pay_by": 150.0},
+        "paid": {"status": "running", "pay_by": 100.0},
+    }
+    assert controller.admit("alice", count_awaiting_payment(jobs)).status_code == 503
+
+    assert expire_unpaid_jobs(jobs, now=200.0) == ["abandoned-1", "abandoned-2"]
+    assert jobs["abandoned-1"]["status"] == PAYMENT_EXPIRED
+    assert jobs["paid"]["status"] == "running"
+    assert controller.admit("alice", count_awaiting_payment(jobs)).allowed
@@ -0,0 +1,48 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+
+from batch_runner import BatchRunner, completed_ids, read_manifest
+
+
+def test_read_manifest_jsonl_and_csv(tmp_path):
+    jsonl = tmp_path / "manifest.jsonl"
+    jsonl.write_text(
+        json.dumps({"id": "acme-iso", "standard_id": "iso27001", "source_url": "https://x/policy.txt"}) + "\n"
+        + json.dumps({"standard_id": "soc2", "source_url": "https://x/policy.txt"}) + "\n"
+    )
+    rows = read_manifest(str(jsonl))
+    assert rows[0]["id"] == "acme-iso"
+    assert len(rows[1]["id"]) == 16  # derived, stable id
+
+    csv_path = tmp_path / "manifest.csv"
+    csv_path.write_text("id,standard_id,source_url,scope\nr1,gdpr,https://x/privacy.txt,\n")
+    assert read_manifest(str(csv_path)) == [
+        {"id": "r1", "standard_id": "gdpr", "source_url": "https://x/privacy.txt"}
+    ]
+
+
+def test_batch_resumes_and_retries_only_failed_rows(tmp_path):
+    rows = [{"id": f"row-{i}", "standard_id": "soc2"} for i in range(4)]
+    output = str(tmp_path / "results.jsonl")
+    calls = []
+
+    def flaky(row):
+        calls.append(row["id"])
+        if row["id"] == "row-2":
+            raise RuntimeError("LLM timeout")
+        return {"overall_readiness": 1.0}
+
+    first = BatchRunner(parallelism=2).run(rows, output, runner=flaky)
+    assert first == {"total": 4, "skipped": 0, "completed": 3, "failed": 1}
+
+    # Simulate an interruption mid-write
+    with open(output, "a") as f:
+        f.write('{"id": "row-3", "stat')
+
+    calls.clear()
+    second = BatchRunner(parallelism=2).run(rows, output, runner=lambda row: calls.append(row["id"]) or {})
+    assert calls == ["row-2"]
+    assert second["skipped"] == 3
+    assert completed_ids(output) == {"row-0", "row-1", "row-2", "row-3"}
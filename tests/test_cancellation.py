@@ -0,0 +1,136 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import threading
+import time
+
+import pytest
+
+from cancellation import CancellationToken, DeadlineExceeded, JobCancelled, deadline_from_submit_result_time
+import job_queue
+from job_queue import JobQueue, CANCELLED, FAILED, QUEUED
+from worker import process_one
+
+
+def test_check_raises_after_cancel():
+    token = CancellationToken()
+    token.check()
+    token.cancel("user request")
+    with pytest.raises(JobCancelled, match="user request"):
+        token.check()
+
+
+def test_overall_and_stage_deadlines():
+    with pytest.raises(DeadlineExceeded):
+        CancellationToken(deadline=time.time() - 1).check()
+
+    token = CancellationToken()
+    with token.stage("mapping", timeout=0.05):
+        time.sleep(0.1)
+        with pytest.raises(DeadlineExceeded, match="mapping"):
+            token.check()
+
+
+def test_stage_timeout_does_not_cancel_other_stages():
+    token = CancellationToken()
+    with token.stage("mapping", timeout=0.05):
+        with pytest.raises(DeadlineExceeded):
+            token.run(time.sleep, 1)
+    assert not token.cancelled
+    with token.stage("report", timeout=60):
+        token.check()
+
+
+def test_stage_deadline_is_restored_after_block():
+    token = CancellationToken()
+    with token.stage("report", timeout=60):
+        assert 0 < token.remaining() <= 60
+    assert token.remaining() is None
+
+
+def test_run_returns_result_or_stops_waiting_when_cancelled():
+    token = CancellationToken()
+    assert token.run(lambda x: x * 2, 21) == 42
+
+    release = threading.Event()
+    threading.Timer(0.1, token.cancel).start()
+    started = time.monotonic()
+    with pytest.raises(JobCancelled):
+        token.run(release.wait, 30)
+    assert time.monotonic() - started < 5
+    release.set()
+
+
+def test_child_token_stops_early_without_cancelling_parent():
+    parent = CancellationToken(deadline=time.time() + 60)
+    child = parent.child(time.time() - 1)
+    with pytest.raises(DeadlineExceeded):
+        child.check()
+    parent.check()
+
+    parent.cancel("user request")
+    with pytest.raises(JobCancelled, match="user request") as raised:
+        parent.child(time.time() + 60).check()
+    assert not isinstance(raised.value, DeadlineExceeded)
+
+
+def test_deadline_from_submit_result_time():
+    assert deadline_from_submit_result_time(None) is None
+    assert deadline_from_submit_result_time("1700000000000", margin=60) == 1700000000 - 60
+    assert deadline_from_submit_result_time(1700000000, margin=0) == 1700000000
+
+
+def test_cancelling_a_queued_job_skips_it(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    queue.enqueue("a", {})
+    assert queue.cancel("a") == CANCELLED
+    assert queue.claim("w1") is None
+    assert queue.depth() == 0
+
+
+def test_expired_deadline_is_not_started(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    queue.enqueue("late", {}, deadline=time.time() - 1)
+    assert queue.claim("w1") is None
+    assert queue.get("late")["status"] == FAILED
+
+
+def test_cancel_frees_a_running_worker(tmp_path, monkeypatch):
+    monkeypatch.setattr("worker.CANCEL_POLL_INTERVAL", 0.05)
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    queue.enqueue("a", {})
+
+    def long_job(job_id, payload, cancel_token):
+        threading.Timer(0.2, queue.cancel, args=(job_id,)).start()
+        while True:
+            cancel_token.check()
+            time.sleep(0.01)
+
+    started = time.monotonic()
+    assert process_one(queue, "w1", handler=long_job)
+    assert time.monotonic() - started < 5
+    assert queue.get("a")["status"] == CANCELLED
+
+
+def test_stage_timeout_is_retried_but_job_deadline_is_final(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, "backoff_delay", lambda attempts: 0.0)
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    queue.enqueue("slow-stage", {}, max_attempts=3, deadline=time.time() + 60)
+    queue.enqueue("late", {}, max_attempts=3, deadline=time.time() + 0.1)
+
+    def stage_timeout(job_id, payload, cancel_token):
+        with cancel_token.stage("loading", timeout=0.01):
+            time.sleep(0.05)
+            cancel_token.check()
+
+    assert process_one(queue, "w1", handler=stage_timeout)
+    assert queue.get("slow-stage")["status"] == QUEUED
+
+    queue.cancel("slow-stage")
+
+    def job_deadline(job_id, payload, cancel_token):
+        time.sleep(0.15)
+        cancel_token.check()
+
+    assert process_one(queue, "w1", handler=job_deadline)
+    assert queue.get("late")["status"] == FAILED
@@ -0,0 +1,66 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pipeline.control_equivalence import ControlEquivalenceIndex, documents_hash
+
+ISO_BACKUP = {
+    "id": "A.8.13",
+    "title": "Information backup",
+    "description": "Maintain and regularly test backup copies of information, software and systems.",
+    "domain": "A.8",
+}
+ISO_TRAINING = {
+    "id": "A.6.3",
+    "title": "Security awareness training",
+    "description": "Personnel receive security awareness education and training.",
+}
+
+
+def _index(tmp_path):
+    index = ControlEquivalenceIndex(str(tmp_path / "evaluations.db"))
+    index.record("iso27001-2022", [ISO_BACKUP, ISO_TRAINING], [
+        {"control_id": "A.8.13", "coverage": "covered", "evidence": [], "notes": "Backups tested quarterly."},
+        {"control_id": "A.6.3", "coverage": "not_covered", "evidence": [], "notes": "No training program."},
+    ], evidence_hash="evidence-1")
+    return index
+
+
+def test_equivalent_control_reuses_evaluation_on_same_evidence(tmp_path):
+    index = _index(tmp_path)
+    nist_backup = {
+        "id": "CP-9",
+        "title": "Information backup",
+        "description": "Maintain and regularly test backup copies of information, software and systems.",
+        "domain": "CP",
+    }
+
+    result = index.lookup([nist_backup], "evidence-1")
+
+    assert result.to_map == []
+    reused = result.reused[0]
+    assert reused["control_id"] == "CP-9"
+    assert reused["domain"] == "CP"
+    assert reused["coverage"] == "covered"
+    assert reused["reused_from"]["control_id"] == "A.8.13"
+
+
+def test_related_control_is_seeded_and_other_evidence_is_ignored(tmp_path):
+    index = _index(tmp_path)
+    nist_training = {
+        "id": "AT-2",
+        "title": "Literacy training and awareness",
+        "description": "Provide security literacy training to system users, including phishing.",
+    }
+
+    seeded = index.lookup([nist_training], "evidence-1", reuse_threshold=0.95, seed_threshold=0.2)
+    assert seeded.reused == []
+    assert seeded.to_map[0]["related_evaluation"]["control_id"] == "A.6.3"
+    assert seeded.to_map[0]["related_evaluation"]["coverage"] == "not_covered"
+
+    other = index.lookup([nist_training], "evidence-2")
+    assert other.to_map == [nist_training]
+
+
+def test_documents_hash_is_order_independent():
+    assert documents_hash({"a": "x", "b": "y"}) == documents_hash({"b": "y", "a": "x"})
+    assert documents_hash({"a": "x"}) != documents_hash({"a": "y"})
@@ -0,0 +1,137 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pipeline.domain_partition import (
+    build_report,
+    control_domain,
+    gap_digest,
+    local_summary,
+    mapped_readiness,
+    merge_domain_scores,
+    overall_readiness,
+    partition_controls,
+    prioritize_partitions,
+    score_domain,
+)
+from standards.catalog import get_controls
+
+
+def test_control_domain_falls_back_to_id_family():
+    assert control_domain({"id": "AC-2", "domain": "Access"}) == "Access"
+    assert control_domain({"id": "au-6(1)"}) == "AU"
+    assert control_domain({"id": "A.5.1"}) == "A.5"
+    assert control_domain({"id": "CC6"}) == "General"
+
+
+def test_partitions_group_by_domain_and_split_large_ones():
+    controls = [{"id": f"AC-{i}"} for i in range(5)] + [{"id": "AU-1"}] + [{"id": "AC-9"}]
+    partitions = partition_controls(controls, max_size=3)
+    assert [(d, [c["id"] for c in m]) for d, m in partitions] == [
+        ("AC", ["AC-0", "AC-1", "AC-2"]),
+        ("AC", ["AC-3", "AC-4", "AC-9"]),
+        ("AU", ["AU-1"]),
+    ]
+
+
+def test_catalog_partitions_cover_every_control_once():
+    controls = get_controls("nist80053-r5")
+    partitions = partition_controls(controls)
+    ids = [c["id"] for _, members in partitions for c in members]
+    assert sorted(ids) == sorted(c["id"] for c in controls)
+    assert len({d for d, _ in partitions}) > 5
+
+
+def test_score_domain_prefers_high_priority_gaps():
+    controls = [
+        {"id": "AC-1", "priority": "low"},
+        {"id": "AC-2", "priority": "high"},
+        {"id": "AC-3"},
+    ]
+    evaluations = [
+        {"control_id": "AC-1", "coverage": "not_covered", "missing_elements": ["policy"]},
+        {"control_id": "AC-2", "coverage": "partially_covered", "missing_elements": ["reviews"]},
+        {"control_id": "AC-3", "coverage": "covered"},
+    ]
+    score = score_domain("AC", controls, evaluations)
+    assert score == {
+        "domain": "AC", "score": 0.5, "covered": 1, "partial": 1, "missing": 1,
+        "key_gaps": ["AC-2: reviews", "AC-1: policy"],
+    }
+
+
+def test_merge_domain_scores_weights_by_control_count():
+    merged = merge_domain_scores([
+        {"domain": "AC", "score": 1.0, "covered": 3, "partial": 0, "missing": 0, "key_gaps": []},
+        {"domain": "AU", "score": 0.0, "covered": 0, "partial": 0, "missing": 1, "key_gaps": ["AU-1: logs"]},
+        {"domain": "AC", "score": 0.0, "covered": 0, "partial": 0, "missing": 1, "key_gaps": ["AC-4: x"]},
+    ])
+    assert [d["domain"] for d in merged] == ["AC", "AU"]
+    assert merged[0]["score"] == 0.75
+    assert merged[0]["missing"] == 1 and merged[0]["key_gaps"] == ["AC-4: x"]
+
+
+def test_build_report_matches_report_task_structure():
+    evaluations = [{"control_id": "AC-1", "coverage": "covered"}, {"control_id": "AU-1", "coverage": "not_covered"}]
+    scores = [
+        score_domain("AC", [{"id": "AC-1"}], evaluations),
+        score_domain("AU", [{"id": "AU-1"}], evaluations),
+    ]
+    report = build_report("NIST", "IT", evaluations, scores,
+                          {"overall_summary": "Half ready.", "global_recommendations": ["Enable logging"]})
+    assert set(report) == {
+        "standard_name", "scope", "overall_readiness", "overall_summary",
+        "domain_scores", "evaluations", "global_recommendations", "partial",
+    }
+    assert report["partial"] is False
+    assert report["overall_readiness"] == overall_readiness(evaluations) == 0.5
+    assert gap_digest(scores)[0]["domain"] == "AU"
+
+
+def test_prioritize_partitions_runs_high_priority_controls_first():
+    controls = [
+        {"id": "AC-1", "priority": "low"},
+        {"id": "AU-1", "priority": "medium"},
+        {"id": "AC-2", "priority": "low"},
+        {"id": "SC-1", "priority": "high"},
+        {"id": "AC-3", "priority": "high"},
+        {"id": "AC-4", "priority": "high"},
+        {"id": "AC-5", "priority": "high"},
+    ]
+    partitions = prioritize_partitions(controls, max_size=40, batch_size=2)
+    assert [(d, [c["id"] for c in m]) for d, m in partitions] == [
+        ("SC", ["SC-1"]),
+        ("AC", ["AC-3", "AC-4"]),
+        ("AC", ["AC-5"]),
+        ("AU", ["AU-1"]),
+        ("AC", ["AC-1", "AC-2"]),
+    ]
+
+
+def test_partial_report_lists_unevaluated_controls():
+    evaluations = [
+        {"control_id": "AC-1", "coverage": "partially_covered", "missing_elements": ["reviews"]},
+        {"control_id": "AU-1", "coverage": "not_covered", "prescreened": True},
+    ]
+    scores = [score_domain("AC", [{"id": "AC-1"}, {"id": "AC-2"}], evaluations),
+              score_domain("AU", [{"id": "AU-1"}], evaluations)]
+    summary = local_summary(evaluations, scores, ["AC-2", "SC-1"])
+    report = build_report("NIST", "IT", evaluations, scores, summary, ["AC-2", "SC-1"])
+
+    assert report["partial"] is True
+    assert report["evaluated_controls"] == 2 and report["total_controls"] == 4
+    assert report["unevaluated_controls"] == ["AC-2", "SC-1"]
+    assert report["prescreened_controls"] == 1
+    # overall_readiness counts pre-screened controls; mapped_readiness leaves them out
+    assert report["overall_readiness"] == 0.25
+    assert report["mapped_readiness"] == 0.5
+    assert "partial assessment" in report["overall_summary"]
+
+
+def test_partial_report_without_mapped_controls_still_has_readiness():
+    evaluations = [{"control_id": "AU-1", "coverage": "not_covered", "prescreened": True}]
+    assert mapped_readiness(evaluations) is None
+    summary = local_summary(evaluations, [], ["AC-1"])
+    report = build_report("NIST", "IT", evaluations, [], summary, ["AC-1"])
+    assert report["overall_readiness"] == 0.0
+    assert report["mapped_readiness"] is None
+    assert "none were mapped to evidence" in summary["overall_summary"]
@@ -0,0 +1,75 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import time
+
+import job_queue
+from job_queue import JobQueue, COMPLETED, FAILED, QUEUED
+from worker import process_one
+
+
+def test_claim_respects_priority_and_is_idempotent(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    assert queue.enqueue("batch", {"n": 1}, priority=0)
+    assert queue.enqueue("paid", {"n": 2}, priority=10)
+    assert not queue.enqueue("paid", {"n": 3}, priority=10)  # duplicate payment callback
+
+    assert queue.depth() == 2
+    assert queue.claim("w1")["job_id"] == "paid"
+    assert queue.claim("w1")["job_id"] == "batch"
+    assert queue.claim("w1") is None
+
+
+def test_expired_lease_is_retried_by_another_worker(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    queue.enqueue("job", {}, max_attempts=2)
+
+    assert queue.claim("crashed-worker", visibility_timeout=0.01)["attempts"] == 1
+    time.sleep(0.02)
+
+    job = queue.claim("w2", visibility_timeout=60)
+    assert job["job_id"] == "job"
+    assert job["attempts"] == 2
+    assert not queue.complete("job", "crashed-worker", {"late": True})
+    assert queue.complete("job", "w2", {"ok": True})
+    assert queue.get("job")["result"] == {"ok": True}
+
+
+def test_expired_lease_past_deadline_is_not_reclaimed(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    queue.enqueue("job", {}, max_attempts=3, deadline=time.time() + 0.05)
+
+    assert queue.claim("crashed-worker", visibility_timeout=0.01)
+    time.sleep(0.1)
+
+    assert queue.claim("w2") is None
+    assert queue.get("job")["status"] == FAILED
+
+
+def test_failures_back_off_then_fail(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, "backoff_delay", lambda attempts: 0.0)
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    queue.enqueue("job", {"x": 1}, max_attempts=2)
+
+    def broken(job_id, payload, cancel_token):
+        raise RuntimeError("LLM unavailable")
+
+    assert process_one(queue, "w1", handler=broken)
+    assert queue.get("job")["status"] == QUEUED
+
+    assert process_one(queue, "w1", handler=broken)
+    job = queue.get("job")
+    assert job["status"] == FAILED
+    assert job["error"] == "LLM unavailable"
+    assert not process_one(queue, "w1", handler=broken)
+
+
+def test_process_one_stores_result(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    queue.enqueue("job", {"standard_id": "soc2"})
+
+    assert process_one(queue, "w1", handler=lambda job_id, payload, cancel_token: {"echo": payload["standard_id"]})
+    job = queue.get("job")
+    assert job["status"] == COMPLETED
+    assert job["result"] == {"echo": "soc2"}
+    assert queue.depth() == 0
@@ -0,0 +1,57 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import logging
+
+from logging_config import (
+    JsonFormatter,
+    PayloadSummary,
+    setup_logging,
+    shutdown_logging,
+    summarize_payload,
+)
+
+
+def test_summarize_payload_caps_size():
+    payload = {"standard_url": "https://example.com/iso.txt", "standard_text": "x" * 10_000}
+    summary = summarize_payload(payload, max_chars=200)
+
+    assert len(summary) <= 200 + len("…(+99999 chars)")
+    assert "standard_url=" in summary
+    assert "x" * 500 not in summary
+
+
+def test_payload_summary_is_lazy():
+    class Exploding:
+        def __repr__(self):
+            raise AssertionError("payload rendered although the record was filtered")
+
+    logger = logging.getLogger("lazy-test")
+    logger.setLevel(logging.WARNING)
+    logger.info("Input: %s", PayloadSummary({"value": Exploding()}))
+
+
+def test_json_formatter_includes_extra_fields():
+    record = logging.makeLogRecord({
+        "name": "auditsense", "levelname": "INFO", "msg": "job %s started",
+        "args": ("job-1",), "job_id": "job-1",
+    })
+    payload = json.loads(JsonFormatter().format(record))
+
+    assert payload["message"] == "job job-1 started"
+    assert payload["job_id"] == "job-1"
+
+
+def test_setup_logging_writes_through_background_listener(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    root = setup_logging(json_format=True)
+    try:
+        logging.getLogger("queue-test").info("hello %s", "world")
+    finally:
+        shutdown_logging()  # drains the queue
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+
+    lines = (tmp_path / "logs" / "app.log").read_text().splitlines()
+    assert json.loads(lines[-1])["message"] == "hello world"
@@ -0,0 +1,51 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+import model_routing
+from model_routing import TierStats, is_low_confidence, tier_for_stage
+
+
+def test_only_mapping_escalation_uses_the_strong_tier():
+    tier_for_stage.cache_clear()
+    assert tier_for_stage("extraction") == "small"
+    assert tier_for_stage("mapping") == "small"
+    assert tier_for_stage("report") == "small"
+    assert tier_for_stage("escalation") == "strong"
+
+
+def test_stage_tier_can_be_overridden_per_stage(monkeypatch):
+    tier_for_stage.cache_clear()
+    monkeypatch.setenv("AUDITSENSE_REPORT_TIER", "strong")
+    try:
+        assert tier_for_stage("report") == "strong"
+    finally:
+        tier_for_stage.cache_clear()
+
+
+@pytest.mark.parametrize("evaluation, expected", [
+    ({"coverage": "covered", "confidence": 0.9}, False),
+    ({"coverage": "covered", "confidence": 0.3}, True),
+    ({"coverage": "covered"}, True),                       # no confidence reported
+    ({"coverage": "mostly", "confidence": 0.9}, True),     # invalid verdict
+    ({"coverage": "not_covered", "confidence": "0.75"}, False),
+])
+def test_is_low_confidence(evaluation, expected):
+    assert is_low_confidence(evaluation, threshold=0.6) is expected
+
+
+def test_tier_stats_tracks_cost_and_merges(monkeypatch):
+    monkeypatch.setitem(model_routing.TIER_PRICES, "small", (1.0, 2.0))
+    run = TierStats()
+    run.record("small", 1.5, prompt_tokens=1_000_000, completion_tokens=500_000)
+    run.record("small", 0.5)
+
+    totals = TierStats()
+    totals.merge(run)
+    totals.merge(run)
+
+    small = totals.snapshot()["small"]
+    assert small["calls"] == 4
+    assert small["seconds"] == 4.0
+    assert small["cost_usd"] == pytest.approx(4.0)
@@ -0,0 +1,74 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import time
+
+import pytest
+
+import crew_definition
+from cancellation import CancellationToken, DeadlineExceeded
+from crew_definition import AuditSenseCrew
+from pipeline.control_equivalence import ControlEquivalenceIndex
+
+SECONDS_PER_CONTROL = 0.05
+
+
+def make_crew(tmp_path, monkeypatch):
+    # No agents are needed: _run_stage is replaced by a slow fake mapper
+    monkeypatch.setattr(AuditSenseCrew, "_create_crew", lambda self: None)
+    monkeypatch.setattr(crew_definition, "REPORT_RESERVE_SECONDS", 0.0)
+    crew = AuditSenseCrew(
+        verbose=False,
+        prescreen_threshold=0.0,
+        equivalence_index=ControlEquivalenceIndex(str(tmp_path / "equivalence.db")),
+        partition_workers=2,
+    )
+
+    def slow_mapper(agent, task, inputs, stage, cancel_token=None):
+        with cancel_token.stage(stage):
+            for _ in inputs.get("controls", []):
+                time.sleep(SECONDS_PER_CONTROL)
+                cancel_token.check()
+        return [{"control_id": c["id"], "coverage": "covered", "confidence": 1.0, "evidence": []}
+                for c in inputs.get("controls", [])]
+
+    monkeypatch.setattr(crew, "_run_stage", slow_mapper)
+    return crew
+
+
+def test_deadline_mid_mapping_still_evaluates_high_priority_controls(tmp_path, monkeypatch):
+    crew = make_crew(tmp_path, monkeypatch)
+    high = [{"id": f"{family}-{i}", "priority": "high"} for family in ("AC", "AU") for i in range(3)]
+    low = [{"id": f"{family}-{i}", "priority": "low"} for family in ("AC", "AU") for i in range(10, 20)]
+    controls = low[:5] + high + low[5:]
+
+    # Enough time for the high-priority batches, not for the 20 low-priority controls
+    token = CancellationToken(deadline=time.time() + 12 * SECONDS_PER_CONTROL)
+    result = crew.map_and_score(controls, {"evidence": "Access control and audit logging policy."},
+                                cancel_token=token)
+
+    evaluated = {e["control_id"] for e in result.evaluations}
+    assert {c["id"] for c in high} <= evaluated
+    assert result.unevaluated and set(result.unevaluated) <= {c["id"] for c in low}
+    assert not token.cancelled
+
+    report = crew.generate_report({"standard_name": "Demo", "scope": "IT"}, result.evaluations, token,
+                                  result.domain_scores, result.unevaluated)
+    assert report["partial"] is True
+    assert report["total_controls"] == len(controls)
+    assert isinstance(report["overall_readiness"], float)
+
+
+def test_stage_timeout_before_the_mapping_deadline_is_not_a_partial_result(tmp_path, monkeypatch):
+    crew = make_crew(tmp_path, monkeypatch)
+
+    def hung_mapper(agent, task, inputs, stage, cancel_token=None):
+        with cancel_token.stage(stage, timeout=0.01):
+            time.sleep(0.05)
+            cancel_token.check()
+
+    monkeypatch.setattr(crew, "_run_stage", hung_mapper)
+    token = CancellationToken(deadline=time.time() + 60)
+    with pytest.raises(DeadlineExceeded):
+        crew.map_and_score([{"id": "AC-1", "priority": "high"}], {"evidence": "Access control policy."},
+                           cancel_token=token)
@@ -0,0 +1,52 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pipeline.parsing import parse_task_output
+from pipeline.prescreen import prescreen_controls
+
+
+def test_prescreen_marks_unrelated_controls_not_covered():
+    controls = [
+        {
+            "id": "A.5.1",
+            "title": "Security Policy",
+            "description": "An information security policy shall be defined and approved by management.",
+            "domain": "A.5",
+        },
+        {
+            "id": "A.7.1",
+            "title": "Screening",
+            "description": "Background verification checks on candidates for employment.",
+            "domain": "A.7",
+        },
+    ]
+    documents = {
+        "policy_doc": (
+            "Our company maintains an information security policy approved by management. "
+            "Roles and responsibilities are assigned to the IT and security teams."
+        )
+    }
+
+    result = prescreen_controls(controls, documents, threshold=0.05)
+
+    assert [c["id"] for c in result.candidates] == ["A.5.1"]
+    assert len(result.not_covered) == 1
+
+    evaluation = result.not_covered[0]
+    assert evaluation["control_id"] == "A.7.1"
+    assert evaluation["coverage"] == "not_covered"
+    assert evaluation["evidence"] == []
+    assert evaluation["domain"] == "A.7"
+
+
+def test_prescreen_threshold_zero_sends_everything_with_overlap():
+    controls = [{"id": "C1", "title": "Backups", "description": "Backups are tested."}]
+    result = prescreen_controls(controls, {"d": "Backups are tested monthly."}, threshold=0.0)
+    assert result.candidates == controls
+    assert result.not_covered == []
+
+
+def test_parse_task_output_accepts_fenced_python_literals():
+    raw = "Here you go:\n```python\n[{'control_id': 'A.5.1', 'coverage': 'covered'}]\n```"
+    assert parse_task_output(raw) == [{"control_id": "A.5.1", "coverage": "covered"}]
+    assert parse_task_output('{"a": 1}') == {"a": 1}
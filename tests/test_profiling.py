@@ -0,0 +1,77 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+import threading
+import time
+
+from profiling import JobProfiler, categorize, profile_stage, profiled_thread, should_profile
+
+
+def busy_loop(seconds):
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += 1
+    return total
+
+
+def test_should_profile():
+    assert should_profile("true", sample_percent=0)
+    assert not should_profile(None, sample_percent=0)
+    assert should_profile(None, sample_percent=100)
+
+
+def test_categorize_uses_first_matching_frame_from_leaf():
+    assert categorize(["/usr/lib/python3/ssl.py", "/site-packages/httpx/_client.py", "/site-packages/crewai/agent.py"]) == "llm_wait"
+    assert categorize(["/app/tools/text_extraction.py", "/app/crew_definition.py"]) == "fetch"
+    assert categorize(["/usr/lib/python3/json/decoder.py"]) == "other"
+
+
+def test_stage_separates_cpu_from_waiting(tmp_path):
+    with JobProfiler("job-1", str(tmp_path), interval=0.002) as profiler:
+        with profile_stage("mapping"):
+            time.sleep(0.2)
+        with profile_stage("prescreen"):
+            busy_loop(0.2)
+
+    stages = profiler.summary()["stages"]
+    assert stages["mapping"]["wait_seconds"] > 0.15
+    assert stages["prescreen"]["cpu_seconds"] > 0.1
+    assert stages["prescreen"]["wait_seconds"] < stages["mapping"]["wait_seconds"]
+
+
+def test_tracked_helper_thread_is_sampled_and_exported(tmp_path):
+    with JobProfiler("job-2", str(tmp_path), interval=0.002):
+        with profile_stage("report") as timer:
+            worker = threading.Thread(target=timer.track(busy_loop), args=(0.2,))
+            worker.start()
+            worker.join()
+
+    folded = (tmp_path / "job-2.folded").read_text()
+    assert "busy_loop (test_profiling.py" in folded
+
+    speedscope = json.loads((tmp_path / "job-2.speedscope.json").read_text())
+    profile = speedscope["profiles"][0]
+    assert profile["type"] == "sampled"
+    assert len(profile["samples"]) == len(profile["weights"])
+    assert all(i < len(speedscope["shared"]["frames"]) for stack in profile["samples"] for i in stack)
+
+    summary = json.loads((tmp_path / "job-2.profile.json").read_text())
+    assert summary["stages"]["report"]["cpu_seconds"] > 0.1
+    assert summary["samples"] > 0
+
+
+def test_profiled_pool_thread_is_sampled(tmp_path):
+    with JobProfiler("job-3", str(tmp_path), interval=0.002):
+        worker = threading.Thread(target=profiled_thread(busy_loop), args=(0.2,), name="auditsense-partition_0")
+        worker.start()
+        worker.join()
+
+    assert "auditsense-partition_0;" in (tmp_path / "job-3.folded").read_text()
+
+
+def test_profile_stage_is_a_no_op_without_profiler():
+    with profile_stage("mapping") as timer:
+        assert timer.track(busy_loop) is busy_loop
+    assert profiled_thread(busy_loop) is busy_loop
@@ -0,0 +1,53 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import json
+
+import pytest
+
+from result_store import ResultNotFound, ResultStore, etag_matches, select_report, view_etag
+
+REPORT = {
+    "standard_name": "ISO 27001",
+    "overall_readiness": 0.5,
+    "domain_scores": [{"domain": f"A.{i}", "score": 0.5} for i in range(5, 9)],
+    "evaluations": [{"control_id": f"A.5.{i}", "coverage": "covered"} for i in range(1, 8)],
+}
+
+
+def test_store_round_trips_compressed_compact_json(tmp_path):
+    store = ResultStore(str(tmp_path))
+    etag = store.save("job-1", REPORT)
+
+    assert store.etag("job-1") == etag
+    assert store.load("job-1") == REPORT
+    assert store.load_raw("job-1") == json.dumps(REPORT, separators=(",", ":"))
+
+    stored = [p for p in os.listdir(tmp_path) if p.startswith("job-1.json")]
+    assert len(stored) == 1
+
+    with pytest.raises(ResultNotFound):
+        store.load("missing")
+
+
+def test_select_report_projects_fields_and_paginates():
+    page = select_report(REPORT, fields=["evaluations", "overall_readiness"], offset=5, limit=5)
+
+    assert set(page) == {"evaluations", "overall_readiness", "pagination"}
+    assert [e["control_id"] for e in page["evaluations"]] == ["A.5.6", "A.5.7"]
+    assert page["pagination"]["evaluations"] == {"offset": 5, "limit": 5, "total": 7, "next_offset": None}
+
+    first = select_report(REPORT, limit=2)
+    assert first["pagination"]["domain_scores"]["next_offset"] == 2
+    assert first["standard_name"] == "ISO 27001"
+
+
+def test_view_etags_depend_on_query_and_match_if_none_match():
+    a = view_etag("abc", ["evaluations"], 0, 50)
+    b = view_etag("abc", ["evaluations"], 50, 50)
+
+    assert a != b
+    assert etag_matches(a, a)
+    assert etag_matches(f'W/{a}, "other"', a)
+    assert not etag_matches(b, a)
+    assert not etag_matches(None, a)
@@ -0,0 +1,82 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pipeline.snippet_index import SnippetIndex, verify_evaluations
+
+DOCUMENT = (
+    "ACME Security Policy\n\n"
+    "Our evidence maintains an information security policy approved by management.\n"
+    "Roles and responsibilities are assigned to the IT and\n    security teams.\n"
+    "Backups are encrypted and tested every quarter."
+)
+
+
+def test_exact_snippet_gets_source_offsets_despite_rewrapping():
+    index = SnippetIndex(DOCUMENT)
+    match = index.find("roles and responsibilities are assigned to the IT and security teams")
+
+    assert match["match_score"] == 1.0
+    assert DOCUMENT[match["start"]:match["end"]].startswith("Roles and responsibilities")
+    assert DOCUMENT[match["start"]:match["end"]].endswith("security teams")
+
+
+def test_light_paraphrase_matches_fuzzily_and_hallucination_does_not():
+    index = SnippetIndex(DOCUMENT)
+
+    fuzzy = index.find("Backups are encrypted and tested each quarter", threshold=0.8)
+    assert fuzzy is not None
+    assert 0.8 <= fuzzy["match_score"] < 1.0
+    assert DOCUMENT[fuzzy["start"]:fuzzy["end"]].startswith("Backups")
+
+    assert index.find("Passwords are rotated every 90 days") is None
+
+
+def test_verify_evaluations_drops_hallucinated_evidence_and_downgrades():
+    evaluations = [
+        {
+            "control_id": "A.5.1",
+            "coverage": "covered",
+            "evidence": [{"doc_id": "policy", "snippet": "information security policy approved by management"}],
+        },
+        {
+            "control_id": "A.9.4",
+            "coverage": "covered",
+            "evidence": [{"doc_id": "policy", "snippet": "MFA is enforced for all administrators"}],
+            "notes": "Strong access controls.",
+        },
+    ]
+
+    verify_evaluations(evaluations, {"policy": DOCUMENT}, policy="drop")
+
+    first, second = evaluations
+    assert first["evidence"][0]["verified"] is True
+    assert first["unverified_evidence"] == 0
+    assert second["evidence"] == []
+    assert second["unverified_evidence"] == 1
+    assert second["coverage"] == "partially_covered"
+
+
+def test_verify_evaluations_can_flag_instead_of_drop():
+    evaluations = [{
+        "control_id": "X",
+        "coverage": "partially_covered",
+        "evidence": [{"doc_id": "missing_doc", "snippet": "anything"}],
+    }]
+    verify_evaluations(evaluations, {"policy": DOCUMENT}, policy="flag")
+    assert evaluations[0]["evidence"][0]["verified"] is False
+
+
+def test_verify_evaluations_accepts_string_evidence_and_skips_junk():
+    evaluations = [{
+        "control_id": "A.8.13",
+        "coverage": "covered",
+        "evidence": ["Backups are encrypted and tested every quarter", None, 42],
+    }]
+
+    verify_evaluations(evaluations, {"policy": DOCUMENT}, policy="drop")
+
+    evaluation = evaluations[0]
+    assert [e["doc_id"] for e in evaluation["evidence"]] == ["policy"]
+    assert evaluation["evidence"][0]["verified"] is True
+    assert evaluation["unverified_evidence"] == 2
+    assert evaluation["coverage"] == "covered"
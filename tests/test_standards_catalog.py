@@ -0,0 +1,53 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+from standards.catalog import (
+    UnknownStandardError,
+    get_controls,
+    get_standard,
+    list_standards,
+    resolve_standard_id,
+    save_standard,
+    version_key,
+)
+
+
+def test_catalog_ships_input_schema_standards():
+    ids = {s["standard_id"] for s in list_standards()}
+    for prefix in ("iso27001", "nist80053", "soc2", "pcidss", "gdpr", "rbi-csf"):
+        assert any(sid.startswith(prefix) for sid in ids), prefix
+
+
+def test_get_standard_returns_extractor_shaped_controls():
+    standard = get_standard("iso27001-2022")
+    assert standard["name"].startswith("ISO/IEC 27001")
+    assert len(standard["controls"]) == 93
+
+    control = standard["controls"][0]
+    assert set(control) == {"id", "title", "description", "domain", "priority"}
+
+    # Callers get fresh dicts, so mutating one does not poison the cache
+    control["title"] = "changed"
+    assert get_controls("iso27001-2022")[0]["title"] != "changed"
+
+
+def test_unversioned_id_resolves_to_latest(tmp_path):
+    data_dir = str(tmp_path)
+    save_standard("demo-2013", "Demo", "2013", [{"id": "D1", "title": "Old"}], data_dir=data_dir)
+    save_standard("demo-2022", "Demo", "2022", [{"id": "D1", "title": "New"}], data_dir=data_dir)
+
+    assert resolve_standard_id("DEMO", data_dir) == "demo-2022"
+    assert get_controls("demo", data_dir) == [{"id": "D1", "title": "New"}]
+
+    with pytest.raises(UnknownStandardError):
+        resolve_standard_id("unknown", data_dir)
+
+
+def test_latest_version_compares_numbers_not_strings(tmp_path):
+    data_dir = str(tmp_path)
+    for version in ("r5", "r10", "r9"):
+        save_standard(f"demo-{version}", "Demo", version, [{"id": "D1"}], data_dir=data_dir)
+    assert resolve_standard_id("demo", data_dir) == "demo-r10"
+    assert sorted(["10", "4.0.1", "4.0", "9"], key=version_key) == ["4.0", "4.0.1", "9", "10"]
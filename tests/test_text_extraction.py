@@ -0,0 +1,112 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import io
+import zipfile
+
+from tools.text_extraction import (
+    ExtractionCache,
+    detect_content_type,
+    extract_html,
+    extract_text,
+    iter_normalized,
+    normalize_text,
+    strip_page_furniture,
+)
+
+
+def test_html_extraction_strips_markup_and_boilerplate():
+    html = (
+        "<html><head><title>Policy</title><style>p {color: red}</style></head>"
+        "<body><nav>Home | About</nav>"
+        "<p>Access reviews are performed quarterly.</p>"
+        "<script>trackUser();</script>"
+        "<footer>Copyright ACME</footer></body></html>"
+    ).encode()
+
+    # Feed in tiny chunks to exercise incremental parsing across tag boundaries
+    chunks = [html[i:i + 7] for i in range(0, len(html), 7)]
+    text = normalize_text(extract_html(chunks))
+
+    assert "Access reviews are performed quarterly." in text
+    assert "trackUser" not in text
+    assert "color: red" not in text
+    assert "Home | About" not in text
+    assert "Copyright" not in text
+
+
+def test_streamed_normalization_matches_whole_text(monkeypatch):
+    text = "  Access\treviews are\r\n\r\n\n performed   quarterly. \r\nLogs are kept\x0cfor a year.  \n"
+    expected = "Access reviews are\n\nperformed quarterly.\nLogs are kept\nfor a year."
+    assert normalize_text(text) == expected
+    for size in (1, 2, 5):
+        pieces = [text[i:i + size] for i in range(0, len(text), size)]
+        assert "".join(iter_normalized(pieces)) == expected
+
+    # Overlong lines are flushed at a word boundary without changing the result
+    monkeypatch.setattr("tools.text_extraction.MAX_LINE_CHARS", 4)
+    assert "".join(iter_normalized([text[i:i + 3] for i in range(0, len(text), 3)])) == expected
+
+
+def test_content_type_prefers_magic_bytes_and_header_over_extension():
+    login_page = b"<!DOCTYPE html><html><body>Please sign in</body></html>"
+    assert detect_content_type("text/html; charset=utf-8", "https://example.com/report.pdf", login_page) == "html"
+    assert detect_content_type("", "https://example.com/report.pdf", login_page) == "html"
+    assert detect_content_type("text/html", "https://example.com/report.pdf", b"Not found") == "html"
+    assert detect_content_type("application/octet-stream", "https://example.com/report.pdf", b"%PDF-1.7") == "pdf"
+    assert detect_content_type("application/octet-stream", "https://example.com/report.pdf", b"\x00\x01") == "pdf"
+    assert detect_content_type("text/plain", "https://example.com/notes.txt", b"Backups") == "text"
+
+
+def test_docx_extraction():
+    document_xml = (
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        "<w:body>"
+        "<w:p><w:r><w:t>Information Security Policy</w:t></w:r></w:p>"
+        "<w:p><w:r><w:t>Passwords are rotated </w:t></w:r><w:r><w:t>every 90 days.</w:t></w:r></w:p>"
+        "</w:body></w:document>"
+    )
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("word/document.xml", document_xml)
+
+    assert detect_content_type("", "policy.docx", buffer.getvalue()[:4]) == "docx"
+
+    text, _ = extract_text(buffer, "docx", cache=ExtractionCache())
+    assert text == "Information Security Policy\nPasswords are rotated every 90 days."
+
+
+def test_pdf_pages_drop_page_numbers_and_running_headers():
+    pages = [f"ACME Confidential\nSection {page} body text.\n12\nPage {page} of 3" for page in range(1, 4)]
+    text = normalize_text("\n".join(strip_page_furniture(pages)))
+
+    assert "ACME Confidential" not in text
+    assert "Page 1 of 3" not in text
+    assert "Section 2 body text." in text
+    # A number in the body is not a page number
+    assert text.count("12") == 3
+
+
+def test_html_table_keeps_numeric_and_repeated_cells():
+    rows = [("Password minimum length", "12"), ("Log retention (days)", "365"),
+            ("MFA", "Enabled"), ("SSO", "Enabled"), ("VPN", "Enabled")]
+    html = "<table>" + "".join(f"<tr><td>{k}</td><td>{v}</td></tr>" for k, v in rows) + "</table>"
+    text = normalize_text(extract_html([html.encode()]))
+
+    assert "Password minimum length\n\n12" in text
+    assert "Log retention (days)\n\n365" in text
+    assert text.count("Enabled") == 3
+
+
+def test_extraction_cache_reuses_text_by_content_hash():
+    cache = ExtractionCache()
+    first = io.BytesIO(b"Backups are tested monthly.")
+    second = io.BytesIO(b"Backups are tested monthly.")
+
+    text, digest = extract_text(first, "text", cache=cache)
+    cache.put(f"{digest}-text", "cached copy")
+
+    cached_text, cached_digest = extract_text(second, "text", cache=cache)
+    assert cached_digest == digest
+    assert text == "Backups are tested monthly."
+    assert cached_text == "cached copy"
@@ -0,0 +1,161 @@
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import gc
+import io
+import random
+import re
+import time
+import tracemalloc
+import weakref
+
+import pytest
+
+import pipeline.text_store as text_store_module
+from pipeline.control_equivalence import documents_hash
+from pipeline.prescreen import TfidfIndex, evidence_excerpts, prescreen_controls
+from pipeline.snippet_index import verify_evaluations
+from pipeline.text_store import (
+    PEAK_MEMORY_BASE_MB,
+    PEAK_MEMORY_PER_TEXT_MB,
+    TextStore,
+    iter_matches,
+)
+from standards.catalog import get_controls
+from tools.text_extraction import iter_text
+
+TEXT = "Politique de sécurité — ✓ approved.\nBackups are encrypted and tested every quarter. " * 40
+
+
+@pytest.fixture
+def small_blocks(monkeypatch):
+    # Tiny checkpoints so slices and matches cross block boundaries
+    monkeypatch.setattr(text_store_module, "CHECKPOINT_CHARS", 16)
+
+
+def test_views_slice_by_character_across_blocks(tmp_path, small_blocks):
+    store = TextStore(str(tmp_path))
+    view = store.open(store.put(TEXT))
+
+    assert len(view) == len(TEXT)
+    assert view.read() == TEXT
+    for start, stop in [(0, 5), (10, 40), (15, 17), (100, 1000), (len(TEXT) - 3, len(TEXT) + 10)]:
+        assert view[start:stop] == TEXT[start:stop]
+    assert view[-1] == TEXT[-1]
+
+
+def test_put_is_content_addressed_and_remembers_sources(tmp_path):
+    store = TextStore(str(tmp_path))
+    first = store.put(TEXT, source="raw-sha-html")
+    second = store.put(iter([TEXT[:100], TEXT[100:]]))
+
+    assert first == second
+    assert store.find_source("raw-sha-html") == first
+    assert store.find_source("unknown") is None
+    assert len([name for name in os.listdir(tmp_path) if name.endswith(".txt")]) == 1
+
+
+def test_put_streams_many_pieces_across_blocks(tmp_path, small_blocks):
+    store = TextStore(str(tmp_path))
+    pieces = [TEXT[i:i + 7] for i in range(0, len(TEXT), 7)] + [TEXT * 3]
+    view = store.open(store.put(iter(pieces)))
+    assert view.read() == TEXT * 4
+
+
+def test_unreferenced_views_are_closed(tmp_path):
+    store = TextStore(str(tmp_path), cached_views=1)
+    first, second = store.put(TEXT), store.put(TEXT[:100])
+
+    view = store.open(first)
+    assert store.open(first) is view
+    mapping = view._data
+    store.open(second)  # evicts `first` from the recently used views
+    alive = weakref.ref(view)
+    del view
+    gc.collect()
+
+    assert alive() is None and mapping.closed
+    assert store.open(first).read() == TEXT
+
+
+def test_sweep_deletes_unused_texts_only(tmp_path):
+    store = TextStore(str(tmp_path))
+    old = store.put(TEXT, source="old-html")
+    kept = store.put(TEXT[:100])
+    view = store.open(kept)
+    stale = time.time() - 3600
+    for name in os.listdir(tmp_path):
+        os.utime(tmp_path / name, (stale, stale))
+
+    assert store.sweep(max_age=60) == 1
+    assert store.find_source("old-html") is None
+    assert not (tmp_path / f"{old.digest}.txt").exists()
+    assert view.read() == TEXT[:100]
+
+
+def test_iter_matches_streams_views_like_finditer(tmp_path, small_blocks):
+    store = TextStore(str(tmp_path))
+    view = store.open(store.put(TEXT))
+    pattern = re.compile(r"\w+")
+
+    expected = [(m.group(), m.start(), m.end()) for m in pattern.finditer(TEXT)]
+    assert list(iter_matches(view, pattern, chunk_chars=16)) == expected
+
+
+def test_views_and_strings_hash_and_verify_alike(tmp_path):
+    store = TextStore(str(tmp_path))
+    view = store.open(store.put(TEXT))
+    assert documents_hash({"policy": view}) == documents_hash({"policy": TEXT})
+
+    evaluations = [{
+        "control_id": "A.8.13",
+        "coverage": "covered",
+        "evidence": [{"doc_id": "policy", "snippet": "backups are encrypted and tested"}],
+    }]
+    verify_evaluations(evaluations, {"policy": view})
+    evidence = evaluations[0]["evidence"][0]
+    assert TEXT[evidence["start"]:evidence["end"]] == "Backups are encrypted and tested"
+
+
+def test_excerpts_keep_small_documents_whole_and_cut_large_ones(tmp_path):
+    controls = get_controls("nist80053-r5")[:5]
+    assert evidence_excerpts(controls, {"policy": TEXT}) == {"policy": TEXT}
+
+    excerpts = evidence_excerpts(controls, {"policy": TEXT}, budget=2000)
+    assert 0 < len(excerpts["policy"]) <= 2000 + 200
+    for part in excerpts["policy"].split("\n[…]\n"):
+        assert part in TEXT
+
+
+def test_local_stages_stay_within_documented_peak_memory(tmp_path):
+    """Peak heap of extraction, store, pre-screen, excerpts and verification for a ~3 MB document."""
+    controls = get_controls("nist80053-r5")
+    vocabulary = " ".join(c["description"] for c in controls).split()
+    rng = random.Random(7)
+    lines = (" ".join(rng.choice(vocabulary) for _ in range(12)) for _ in range(36_000))
+    raw = io.BytesIO("\n".join(lines).encode("utf-8"))
+    text_mb = len(raw.getvalue()) / 2 ** 20
+    assert text_mb > 2.5
+    store = TextStore(str(tmp_path))
+
+    tracemalloc.start()
+    try:
+        ref = store.put(iter_text(raw, "text"))
+        documents = {"evidence": store.open(ref)}
+        index = TfidfIndex.from_documents(documents)
+        screened = prescreen_controls(controls[:10], documents, index=index)
+        evidence_excerpts(screened.candidates, documents, index)
+        view = documents["evidence"]
+        evaluations = [
+            {"control_id": str(i), "coverage": "covered",
+             "evidence": [{"doc_id": "evidence", "snippet": view[i * 50000:i * 50000 + 120]}]}
+            for i in range(20)
+        ]
+        verify_evaluations(evaluations, documents)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert all(e["evidence"] for e in evaluations)
+    limit_mb = PEAK_MEMORY_BASE_MB + PEAK_MEMORY_PER_TEXT_MB * text_mb
+    assert peak / 2 ** 20 <= limit_mb
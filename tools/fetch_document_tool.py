@@ -1,9 +1,20 @@
 # agents/tools/fetch_document_tool.py
 
+import hashlib
+import os
+import tempfile
 import requests
 from typing import Type
 from crewai.tools import BaseTool
 from pydantic import BaseModel, Field
+from cancellation import JobCancelled
+from tools.text_extraction import ExtractionCache, ExtractionError, detect_content_type, extract_text, iter_text
+
+MAX_DOCUMENT_BYTES = int(os.getenv("AUDITSENSE_MAX_DOCUMENT_MB", "50")) * 1024 * 1024
+SPOOL_BYTES = 1024 * 1024  # keep small downloads in memory, spill larger ones to disk
+REQUEST_TIMEOUT = 15.0
+# Text going into a TextStore is not also kept in the in-memory extraction cache
+_NO_CACHE = ExtractionCache(max_entries=0, cache_dir="")
 
 
 # ✅ Input schema for the tool
@@ -18,13 +29,20 @@ class FetchDocumentToolInput(BaseModel):
 class FetchDocumentTool(BaseTool):
     name: str = "Fetch Document Text from URL"
     description: str = (
-        "Fetch plain text content from a URL. Returns raw document text and passes along "
-        "domain keywords for downstream processing."
+        "Fetch a document (HTML, PDF, DOCX or plain text) from a URL and return its "
+        "normalized plain text. Passes along domain keywords for downstream processing."
     )
     args_schema: Type[BaseModel] = FetchDocumentToolInput
 
-    def _run(self, source_url: str, domain_keywords: str = "") -> dict:
-        """Main tool logic: fetch text from the given URL with headers."""
+    def _run(self, source_url: str, domain_keywords: str = "", cancel_token=None, text_store=None) -> dict:
+        """
+        Main tool logic: stream the URL to a bounded buffer, then extract normalized text.
+
+        With a `cancel_token` the download is checked between chunks and raises
+        JobCancelled instead of returning an error dict. With a `text_store`
+        the text is stored there and returned as `document_ref` (a TextRef)
+        instead of `document_text`.
+        """
         if not source_url:
             return {"document_text": None, "domain_keywords": domain_keywords, "error": "Missing source_url"}
 
@@ -34,23 +52,80 @@ class FetchDocumentTool(BaseTool):
                 "AppleWebKit/537.36 (KHTML, like Gecko) "
                 "Chrome/118.0.0.0 Safari/537.36"
             ),
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+            "Accept": (
+                "text/html,application/xhtml+xml,application/xml;q=0.9,"
+                "application/pdf,application/vnd.openxmlformats-officedocument.wordprocessingml.document,"
+                "text/plain,*/*;q=0.8"
+            ),
             "Referer": source_url,
         }
 
+        timeout = REQUEST_TIMEOUT
+        if cancel_token is not None:
+            cancel_token.check()
+            remaining = cancel_token.remaining()
+            if remaining is not None:
+                timeout = max(1.0, min(timeout, remaining))
+
         try:
-            response = requests.get(source_url, headers=headers, timeout=15)
-            response.raise_for_status()
-            text = response.text
+            with requests.get(source_url, headers=headers, timeout=timeout, stream=True) as response, \
+                    tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES) as buffer:
+                response.raise_for_status()
+
+                digest = hashlib.sha256()
+                size = 0
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    if cancel_token is not None:
+                        cancel_token.check()
+                    size += len(chunk)
+                    if size > MAX_DOCUMENT_BYTES:
+                        return {
+                            "document_text": None,
+                            "domain_keywords": domain_keywords,
+                            "error": f"Document exceeds {MAX_DOCUMENT_BYTES // (1024 * 1024)} MB limit",
+                        }
+                    digest.update(chunk)
+                    buffer.write(chunk)
+
+                content_type = response.headers.get("Content-Type", "")
+                # requests defaults text/* to ISO-8859-1 when no charset is sent; prefer UTF-8.
+                encoding = response.encoding if "charset=" in content_type.lower() else "utf-8"
+
+                buffer.seek(0)
+                kind = detect_content_type(content_type, source_url, buffer.read(512))
+                content_hash = digest.hexdigest()
+
+                if text_store is None:
+                    text, _ = extract_text(buffer, kind, encoding=encoding, digest=content_hash)
+                    return {
+                        "document_text": text,
+                        "domain_keywords": domain_keywords,
+                        "content_type": kind,
+                        "content_hash": content_hash,
+                        "error": None,
+                    }
+
+                source = f"{content_hash}-{kind}"
+                ref = text_store.find_source(source)
+                if ref is None:
+                    # Extracted and normalized pieces go straight to disk; no full-text copy is held
+                    ref = text_store.put(iter_text(buffer, kind, encoding), source=source)
 
             return {
-                "document_text": text,
+                "document_text": None,
+                "document_ref": ref,
                 "domain_keywords": domain_keywords,
+                "content_type": kind,
+                "content_hash": content_hash,
                 "error": None,
             }
 
+        except JobCancelled:
+            raise
         except requests.exceptions.Timeout:
             return {"document_text": None, "domain_keywords": domain_keywords, "error": "Request timed out"}
+        except ExtractionError as e:
+            return {"document_text": None, "domain_keywords": domain_keywords, "error": f"Extraction error: {str(e)}"}
         except requests.exceptions.RequestException as e:
             return {"document_text": None, "domain_keywords": domain_keywords, "error": f"HTTP error: {str(e)}"}
         except Exception as e:
@@ -0,0 +1,440 @@
+# tools/text_extraction.py
+
+import codecs
+import hashlib
+import os
+import re
+import threading
+import zipfile
+from collections import Counter, OrderedDict
+from html.parser import HTMLParser
+from xml.etree import ElementTree
+
+CHUNK_SIZE = 64 * 1024
+
+# Tags whose content is never useful evidence (markup, scripts, site chrome).
+HTML_SKIP_TAGS = {
+    "script", "style", "noscript", "template", "svg", "iframe", "canvas",
+    "nav", "header", "footer", "aside", "form", "button", "select",
+}
+HTML_BLOCK_TAGS = {
+    "p", "div", "br", "li", "tr", "td", "th", "h1", "h2", "h3", "h4", "h5", "h6",
+    "section", "article", "main", "table", "ul", "ol", "pre", "blockquote",
+    "dd", "dt", "hr", "title",
+}
+
+CONTENT_TYPES = {
+    "application/pdf": "pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": "docx",
+    "text/html": "html",
+    "application/xhtml+xml": "html",
+}
+# Content-Types that say nothing about the format; fall back to the URL extension
+GENERIC_CONTENT_TYPES = {
+    "application/octet-stream", "binary/octet-stream", "application/zip",
+    "application/download", "application/force-download",
+}
+
+WORD_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+_PAGE_NUMBER_RE = re.compile(r"^(page\s+)?\d+(\s+(of|/)\s+\d+)?$", re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r"[ \t\f\v\u00a0]+")
+_DIGITS_RE = re.compile(r"\d+")
+# The line boundaries str.splitlines() recognizes
+_LINE_BREAK_RE = re.compile(r"\r\n|[\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029]")
+_LAST_WORD_RE = re.compile(r"\s+\S*\Z")
+
+# Longest unfinished line buffered while normalizing a stream
+MAX_LINE_CHARS = 64 * 1024
+
+# Lines at the top and bottom of each PDF page checked for headers/footers
+PAGE_EDGE_LINES = 2
+
+
+class ExtractionError(Exception):
+    """Raised when a document cannot be converted to plain text."""
+
+
+# --- Content type detection ---
+
+def detect_content_type(content_type: str = "", source_url: str = "", head: bytes = b"") -> str:
+    """
+    Return one of 'html', 'pdf', 'docx' or 'text' for a fetched document.
+
+    Magic bytes win, then an explicit Content-Type; the URL extension is only
+    a fallback (an HTML error page served at `report.pdf` is still HTML).
+    """
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    path = (source_url or "").split("?")[0].split("#")[0].lower()
+
+    if head.startswith(b"%PDF"):
+        return "pdf"
+    if head.startswith(b"PK\x03\x04"):
+        return "docx"
+    if head[:512].lstrip().lower().startswith((b"<!doctype html", b"<html")):
+        return "html"
+
+    if content_type and content_type not in GENERIC_CONTENT_TYPES:
+        return CONTENT_TYPES.get(content_type, "text")
+
+    if path.endswith(".pdf"):
+        return "pdf"
+    if path.endswith(".docx"):
+        return "docx"
+    if path.endswith((".html", ".htm")):
+        return "html"
+    return "text"
+
+
+# --- Normalization ---
+
+class _Normalizer:
+    """
+    Streaming form of normalize_text: feed() decoded pieces, get normalized
+    pieces back. Only the current unfinished line is buffered, and lines
+    longer than MAX_LINE_CHARS are flushed at a word boundary.
+    """
+
+    def __init__(self):
+        self._carry = ""
+        self._started = False    # any text emitted yet
+        self._blank = False      # blank line(s) since the last text line
+        self._in_line = False    # part of the current line already emitted
+
+    def _emit(self, segment: str, line_end: bool) -> str:
+        text = _WHITESPACE_RE.sub(" ", segment)
+        if not self._in_line:
+            text = text.lstrip()
+        if line_end:
+            text = text.rstrip()
+        out = ""
+        if text:
+            if not self._in_line and self._started:
+                out = "\n\n" if self._blank else "\n"
+            self._started = self._in_line = True
+            self._blank = False
+            out += text
+        if line_end:
+            if not self._in_line:
+                self._blank = True
+            self._in_line = False
+        return out
+
+    def _lines(self, body: str, out: list) -> str:
+        """Emit every complete line of `body`; return the unfinished remainder."""
+        position = 0
+        for match in _LINE_BREAK_RE.finditer(body):
+            out.append(self._emit(body[position:match.start()], True))
+            position = match.end()
+        return body[position:]
+
+    def feed(self, piece: str) -> str:
+        buffer = self._carry + piece
+        # A trailing "\r" may be the first half of "\r\n"
+        hold = 1 if buffer.endswith("\r") else 0
+        out = []
+        rest = self._lines(buffer[:len(buffer) - hold], out)
+        if len(rest) > MAX_LINE_CHARS:
+            tail = _LAST_WORD_RE.search(rest)
+            cut = tail.start() if tail else len(rest)
+            out.append(self._emit(rest[:cut], False))
+            rest = rest[cut:]
+        self._carry = rest + buffer[len(buffer) - hold:]
+        return "".join(out)
+
+    def finish(self) -> str:
+        out = []
+        rest = self._lines(self._carry, out)
+        out.append(self._emit(rest, True))
+        self._carry = ""
+        return "".join(out)
+
+
+def iter_normalized(pieces):
+    """Normalize an iterable of text pieces, yielding normalized pieces."""
+    normalizer = _Normalizer()
+    for piece in pieces:
+        out = normalizer.feed(piece)
+        if out:
+            yield out
+    out = normalizer.finish()
+    if out:
+        yield out
+
+
+def normalize_text(text: str) -> str:
+    """Collapse runs of whitespace and blank lines."""
+    return "".join(iter_normalized([text]))
+
+
+def _page_edges(lines: list) -> list:
+    """(edge, index, outermost) for the first and last PAGE_EDGE_LINES non-blank lines of a page."""
+    filled = [i for i, line in enumerate(lines) if line.strip()]
+    top, bottom = filled[:PAGE_EDGE_LINES], filled[-PAGE_EDGE_LINES:]
+    return [("top", i, n == 0) for n, i in enumerate(top)] + \
+           [("bottom", i, n == len(bottom) - 1) for n, i in enumerate(bottom)]
+
+
+def _edge_keys(line: str, outermost: bool) -> set:
+    line = line.lower()
+    if outermost:
+        # Running footers often carry the page number ("ACME — 3")
+        return {line, _DIGITS_RE.sub("#", line)}
+    return {line}
+
+
+def strip_page_furniture(pages: list) -> list:
+    """
+    Drop running headers, footers and page numbers from PDF pages.
+
+    Only lines at the top and bottom of each page are candidates: a bare
+    page number as the very first or last line, and short text lines that
+    recur at the same edge of at least three pages (digits ignored on the
+    outermost line, so "Page 2 of 9" matches "Page 3 of 9").
+    """
+    split = [[_WHITESPACE_RE.sub(" ", line).strip() for line in page.splitlines()] for page in pages]
+
+    counts = Counter()
+    for lines in split:
+        seen = set()
+        for edge, i, outermost in _page_edges(lines):
+            seen.update((edge, key) for key in _edge_keys(lines[i], outermost))
+        counts.update(seen)
+
+    cleaned = []
+    for lines in split:
+        drop = set()
+        for edge, i, outermost in _page_edges(lines):
+            line = lines[i]
+            repeated = len(line) < 80 and any(c.isalpha() for c in line) and any(
+                counts[(edge, key)] >= 3 for key in _edge_keys(line, outermost)
+            )
+            if repeated or (outermost and _PAGE_NUMBER_RE.match(line)):
+                drop.add(i)
+        cleaned.append("\n".join(line for i, line in enumerate(lines) if i not in drop))
+    return cleaned
+
+
+# --- HTML ---
+
+class _HTMLTextExtractor(HTMLParser):
+    """Incremental HTML → text converter; feed it chunks as they arrive."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in HTML_SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in HTML_BLOCK_TAGS and not self._skip_depth:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in HTML_SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in HTML_BLOCK_TAGS and not self._skip_depth:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.parts.append(data)
+
+
+def iter_html(chunks, encoding: str = "utf-8"):
+    """Convert an iterable of HTML byte chunks to text pieces without buffering the markup."""
+    decoder = codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+    parser = _HTMLTextExtractor()
+    for chunk in chunks:
+        parser.feed(decoder.decode(chunk))
+        yield "".join(parser.parts)
+        parser.parts.clear()
+    parser.feed(decoder.decode(b"", final=True))
+    parser.close()
+    yield "".join(parser.parts)
+
+
+def extract_html(chunks, encoding: str = "utf-8") -> str:
+    return "".join(iter_html(chunks, encoding))
+
+
+# --- DOCX ---
+
+def iter_docx(fileobj):
+    """Stream paragraphs out of word/document.xml, discarding parsed elements as we go."""
+    try:
+        archive = zipfile.ZipFile(fileobj)
+        stream = archive.open("word/document.xml")
+    except (zipfile.BadZipFile, KeyError) as e:
+        raise ExtractionError(f"Invalid DOCX file: {e}")
+
+    first = True
+    with archive, stream:
+        for _, element in ElementTree.iterparse(stream, events=("end",)):
+            if element.tag != f"{WORD_NS}p":
+                continue
+            pieces = []
+            for node in element.iter():
+                if node.tag == f"{WORD_NS}t" and node.text:
+                    pieces.append(node.text)
+                elif node.tag == f"{WORD_NS}tab":
+                    pieces.append("\t")
+                elif node.tag in (f"{WORD_NS}br", f"{WORD_NS}cr"):
+                    pieces.append("\n")
+            element.clear()
+            yield "".join(pieces) if first else "\n" + "".join(pieces)
+            first = False
+
+
+def extract_docx(fileobj) -> str:
+    return "".join(iter_docx(fileobj))
+
+
+# --- PDF ---
+
+def iter_pdf(fileobj):
+    """Extract text page by page, minus page furniture. Requires the optional `pypdf` package."""
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise ExtractionError("PDF support requires the optional 'pypdf' package")
+
+    try:
+        reader = PdfReader(fileobj)
+        pages = [page.extract_text() or "" for page in reader.pages]
+    except Exception as e:
+        raise ExtractionError(f"Invalid PDF file: {e}")
+    for number, page in enumerate(strip_page_furniture(pages)):
+        yield page if number == 0 else "\n" + page
+
+
+def extract_pdf(fileobj) -> str:
+    return "".join(iter_pdf(fileobj))
+
+
+# --- Plain text ---
+
+def iter_plain(chunks, encoding: str = "utf-8"):
+    decoder = codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+    for chunk in chunks:
+        yield decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
+
+
+def extract_plain(chunks, encoding: str = "utf-8") -> str:
+    return "".join(iter_plain(chunks, encoding))
+
+
+# --- Cache ---
+
+class ExtractionCache:
+    """
+    LRU cache of normalized text keyed by the SHA-256 of the raw document bytes.
+
+    If `cache_dir` is set (or AUDITSENSE_TEXT_CACHE_DIR), entries are also
+    written to disk so separate processes can share them.
+    """
+
+    def __init__(self, max_entries: int = 128, cache_dir: str = None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir if cache_dir is not None else os.getenv("AUDITSENSE_TEXT_CACHE_DIR")
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, f"{digest}.txt")
+
+    def get(self, digest: str):
+        with self._lock:
+            if digest in self._entries:
+                self._entries.move_to_end(digest)
+                return self._entries[digest]
+
+        if self.cache_dir and os.path.exists(self._path(digest)):
+            with open(self._path(digest), encoding="utf-8") as f:
+                text = f.read()
+            self._remember(digest, text)
+            return text
+        return None
+
+    def put(self, digest: str, text: str) -> None:
+        self._remember(digest, text)
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = self._path(digest) + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, self._path(digest))
+
+    def _remember(self, digest: str, text: str) -> None:
+        with self._lock:
+            self._entries[digest] = text
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+extraction_cache = ExtractionCache()
+
+
+# --- Pipeline ---
+
+def _iter_file(fileobj, chunk_size: int = CHUNK_SIZE):
+    fileobj.seek(0)
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def hash_file(fileobj) -> str:
+    digest = hashlib.sha256()
+    for chunk in _iter_file(fileobj):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def iter_text(fileobj, kind: str, encoding: str = "utf-8"):
+    """
+    Yield the normalized text of a seekable binary file piece by piece.
+
+    HTML, DOCX and plain text are decoded, extracted and normalized as a
+    stream, so only the current chunk and line are in memory. PDF pages are
+    all extracted first (page furniture is found across pages), then streamed.
+    """
+    fileobj.seek(0)
+    if kind == "html":
+        pieces = iter_html(_iter_file(fileobj), encoding)
+    elif kind == "pdf":
+        pieces = iter_pdf(fileobj)
+    elif kind == "docx":
+        pieces = iter_docx(fileobj)
+    else:
+        pieces = iter_plain(_iter_file(fileobj), encoding)
+    return iter_normalized(pieces)
+
+
+def extract_text(fileobj, kind: str, encoding: str = "utf-8", digest: str = None, cache=None):
+    """
+    Convert a seekable binary file to normalized plain text.
+
+    Returns (text, digest). The result is cached by content hash, so the same
+    document fetched from a different URL is only parsed once.
+    """
+    cache = extraction_cache if cache is None else cache
+    digest = digest or hash_file(fileobj)
+    key = f"{digest}-{kind}"
+
+    cached = cache.get(key)
+    if cached is not None:
+        return cached, digest
+
+    text = "".join(iter_text(fileobj, kind, encoding))
+    cache.put(key, text)
+    return text, digest
@@ -0,0 +1,156 @@
+# worker.py
+
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from contextlib import nullcontext
+
+from cancellation import CancellationToken, DeadlineExceeded, JobCancelled
+from job_queue import JobQueue, DEFAULT_VISIBILITY_TIMEOUT, RUNNING
+from logging_config import setup_logging, get_logger
+from pipeline.text_store import text_store
+from profiling import JobProfiler, should_profile
+from result_store import ResultStore
+
+DEFAULT_WORKERS = int(os.getenv("AUDITSENSE_WORKERS", "2"))
+POLL_INTERVAL = float(os.getenv("AUDITSENSE_WORKER_POLL_INTERVAL", "1.0"))
+# How often a running job checks whether it was cancelled
+CANCEL_POLL_INTERVAL = float(os.getenv("AUDITSENSE_CANCEL_POLL_INTERVAL", "2.0"))
+# How often a worker deletes stored document texts past their retention
+TEXT_SWEEP_INTERVAL = float(os.getenv("AUDITSENSE_TEXT_STORE_SWEEP_SECONDS", "3600"))
+
+
+def execute_job(job_id: str, payload: dict, cancel_token: CancellationToken = None) -> dict:
+    """
+    Run the AuditSense pipeline for one queued job.
+
+    The report goes to the result store; the queue only keeps a reference.
+    Jobs with `"profile": "true"` in their payload (or sampled via
+    AUDITSENSE_PROFILE_SAMPLE_PERCENT) also get profile files written next to it.
+    """
+    from crew_definition import AuditSenseCrew  # imported lazily: heavy, and only needed in workers
+
+    store = ResultStore()
+    profiler = JobProfiler(job_id, store.directory) if should_profile(payload.get("profile")) else None
+
+    crew = AuditSenseCrew(logger=get_logger("worker"))
+    with profiler or nullcontext():
+        report = crew.run(payload, cancel_token=cancel_token)
+
+    result = {"etag": store.save(job_id, report)}
+    if profiler is not None:
+        result["profile"] = profiler.paths
+    return result
+
+
+def _watch(queue: JobQueue, job_id: str, worker_id: str, stop: threading.Event, timeout: float,
+           token: CancellationToken):
+    """Heartbeat the lease and cancel `token` once the job is cancelled or the lease is lost."""
+    interval = min(CANCEL_POLL_INTERVAL, timeout / 3)
+    next_beat = time.time() + timeout / 3
+    while not stop.wait(interval):
+        if time.time() >= next_beat:
+            if not queue.heartbeat(job_id, worker_id, timeout):
+                token.cancel("lease lost")
+                break
+            next_beat = time.time() + timeout / 3
+        if queue.status(job_id) != RUNNING:
+            token.cancel("cancelled")
+            break
+
+
+def process_one(queue: JobQueue, worker_id: str, visibility_timeout: float = None, handler=execute_job) -> bool:
+    """Claim and run a single job. Returns False if the queue had nothing ready."""
+    logger = get_logger("worker")
+    visibility_timeout = visibility_timeout or DEFAULT_VISIBILITY_TIMEOUT
+
+    job = queue.claim(worker_id, visibility_timeout)
+    if job is None:
+        return False
+
+    job_id = job["job_id"]
+    logger.info("Worker %s picked up job %s (attempt %d)", worker_id, job_id, job["attempts"])
+
+    token = CancellationToken(deadline=job.get("deadline"))
+    stop = threading.Event()
+    beat = threading.Thread(
+        target=_watch, args=(queue, job_id, worker_id, stop, visibility_timeout, token), daemon=True
+    )
+    beat.start()
+    try:
+        result = handler(job_id, job["payload"], token)
+        queue.complete(job_id, worker_id, result)
+        logger.info("Worker %s completed job %s", worker_id, job_id)
+    except DeadlineExceeded as e:
+        if token.expired or (token.deadline is not None and time.time() >= token.deadline):
+            # Retrying cannot beat a job deadline that has already passed
+            queue.fail(job_id, worker_id, str(e), retry=False)
+            logger.warning("Worker %s gave up on job %s: %s", worker_id, job_id, e)
+        else:
+            # A single stage timed out (slow fetch, hung LLM call); the job still has time
+            status = queue.fail(job_id, worker_id, str(e))
+            logger.warning("Worker %s timed out on job %s (%s): %s", worker_id, job_id, status, e)
+    except JobCancelled as e:
+        # The job is already marked cancelled (or owned by another worker); just free the slot
+        logger.info("Worker %s stopped job %s: %s", worker_id, job_id, e)
+    except Exception as e:
+        status = queue.fail(job_id, worker_id, str(e))
+        logger.error("Worker %s failed job %s (%s): %s", worker_id, job_id, status, e, exc_info=True)
+    finally:
+        stop.set()
+        beat.join()
+    return True
+
+
+def run_worker(queue_path: str = None, worker_id: str = None, stop_event=None):
+    """Worker process main loop: claim jobs until `stop_event` is set."""
+    # One log file per process: RotatingFileHandler cannot share a file across processes
+    setup_logging(log_name=f"worker-{os.getpid()}.log")
+    os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    queue = JobQueue(queue_path)
+    get_logger("worker").info("Worker %s started on %s", worker_id, queue.path)
+
+    last_sweep = 0.0
+    while stop_event is None or not stop_event.is_set():
+        if time.monotonic() - last_sweep > TEXT_SWEEP_INTERVAL:
+            last_sweep = time.monotonic()
+            deleted = text_store.sweep()
+            if deleted:
+                get_logger("worker").info("Worker %s removed %d unused stored texts", worker_id, deleted)
+        if not process_one(queue, worker_id):
+            time.sleep(POLL_INTERVAL)
+
+
+def start_workers(count: int = None, queue_path: str = None):
+    """
+    Start `count` worker processes. Returns (processes, stop_event).
+
+    Uses the spawn start method so workers never inherit the API's event loop
+    or logging threads.
+    """
+    count = DEFAULT_WORKERS if count is None else count
+    context = multiprocessing.get_context("spawn")
+    stop_event = context.Event()
+    processes = []
+    for index in range(count):
+        process = context.Process(
+            target=run_worker,
+            kwargs={"queue_path": queue_path, "stop_event": stop_event},
+            name=f"auditsense-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        processes.append(process)
+    return processes, stop_event
+
+
+def stop_workers(processes, stop_event, timeout: float = 10.0):
+    stop_event.set()
+    for process in processes:
+        process.join(timeout)
+        if process.is_alive():
+            process.terminate()